@@ -0,0 +1,46 @@
+"""add habit date indexes
+
+Revision ID: 3f1c9a2b7d4e
+Revises: 
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '3f1c9a2b7d4e'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+TABLES = ["habit_entries", "habit_scores"]
+
+
+def upgrade() -> None:
+    existing_tables = sa.inspect(op.get_bind()).get_table_names()
+    
+    for table in TABLES:
+        # Fresh databases get these indexes from create_all at startup
+        if table not in existing_tables:
+            continue
+        
+        # Keep only the most recent row per (habit_id, date) so the unique index can be built
+        op.execute(
+            f"DELETE FROM {table} WHERE id NOT IN "
+            f"(SELECT MAX(id) FROM {table} GROUP BY habit_id, date)"
+        )
+        op.create_index(f"ix_{table}_habit_id_date", table, ["habit_id", "date"], unique=True, if_not_exists=True)
+        op.create_index(f"ix_{table}_date", table, ["date"], if_not_exists=True)
+
+
+def downgrade() -> None:
+    existing_tables = sa.inspect(op.get_bind()).get_table_names()
+    
+    for table in TABLES:
+        if table not in existing_tables:
+            continue
+        
+        op.drop_index(f"ix_{table}_date", table_name=table, if_exists=True)
+        op.drop_index(f"ix_{table}_habit_id_date", table_name=table, if_exists=True)
@@ -0,0 +1,41 @@
+"""add WHOOP record updated_at columns
+
+Revision ID: c4d9e2a7b1f5
+Revises: 3f1c9a2b7d4e
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'c4d9e2a7b1f5'
+down_revision = '3f1c9a2b7d4e'
+branch_labels = None
+depends_on = None
+
+UPDATED_AT_COLUMNS = ["recovery_updated_at", "sleep_updated_at"]
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    
+    # Fresh databases get the columns from create_all at startup
+    if "whoop_data" not in inspector.get_table_names():
+        return
+    
+    existing = [column["name"] for column in inspector.get_columns("whoop_data")]
+    for column_name in UPDATED_AT_COLUMNS:
+        if column_name not in existing:
+            op.add_column("whoop_data", sa.Column(column_name, sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    
+    if "whoop_data" not in inspector.get_table_names():
+        return
+    
+    with op.batch_alter_table("whoop_data") as batch_op:
+        for column_name in UPDATED_AT_COLUMNS:
+            batch_op.drop_column(column_name)
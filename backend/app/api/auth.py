@@ -1,15 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import RedirectResponse
 from sqlmodel import Session
 from datetime import date, timedelta
 from ..database import get_session
 from ..utils.whoop_client import WhoopAuth
+from ..core.token_store import TokenStore
 from ..config import settings
 
 router = APIRouter(prefix="/api/auth", tags=["authentication"])
 
-# Simple in-memory storage for tokens (in production, use database)
-whoop_tokens = {}
+# Encrypted in the database and shared by all workers and the scheduler
+whoop_tokens = TokenStore("whoop", settings.token_cache_ttl_seconds)
 
 
 @router.get("/whoop")
@@ -41,10 +43,12 @@ async def whoop_oauth_callback(code: str = None, state: str = None, error: str =
     if not token_data:
         raise HTTPException(status_code=400, detail="Failed to exchange code for token")
     
-    # Store tokens (in production, store in database with user association)
-    whoop_tokens["access_token"] = token_data.get("access_token")
-    whoop_tokens["refresh_token"] = token_data.get("refresh_token")
-    whoop_tokens["expires_in"] = token_data.get("expires_in")
+    # Store tokens
+    await run_in_threadpool(whoop_tokens.update, {
+        "access_token": token_data.get("access_token"),
+        "refresh_token": token_data.get("refresh_token"),
+        "expires_in": token_data.get("expires_in")
+    })
     
     # Redirect to frontend success page
     return RedirectResponse(url="/?whoop_connected=true")
@@ -53,22 +57,23 @@ async def whoop_oauth_callback(code: str = None, state: str = None, error: str =
 @router.post("/whoop/refresh")
 async def refresh_whoop_token():
     """Refresh WHOOP access token."""
-    if not whoop_tokens.get("refresh_token"):
+    tokens = await run_in_threadpool(whoop_tokens.snapshot)
+    if not tokens.get("refresh_token"):
         raise HTTPException(status_code=400, detail="No refresh token available")
     
-    token_data = await WhoopAuth.refresh_token(whoop_tokens["refresh_token"])
+    token_data = await WhoopAuth.refresh_token(tokens["refresh_token"])
     
     if not token_data:
         raise HTTPException(status_code=400, detail="Failed to refresh token")
     
     # Update stored tokens
-    whoop_tokens.update(token_data)
+    await run_in_threadpool(whoop_tokens.update, token_data)
     
     return {"message": "Token refreshed successfully"}
 
 
 @router.get("/whoop/status")
-async def get_whoop_connection_status():
+def get_whoop_connection_status():
     """Check WHOOP connection status."""
     is_connected = bool(whoop_tokens.get("access_token"))
     
@@ -79,10 +84,12 @@ async def get_whoop_connection_status():
 
 
 @router.post("/whoop/test-tokens")
-async def set_test_tokens():
+def set_test_tokens():
     """Set test tokens for testing refresh functionality. Remove in production."""
-    whoop_tokens["access_token"] = "test_access_token_123"
-    whoop_tokens["refresh_token"] = "test_refresh_token_456" 
-    whoop_tokens["expires_in"] = 3600
+    whoop_tokens.update({
+        "access_token": "test_access_token_123",
+        "refresh_token": "test_refresh_token_456",
+        "expires_in": 3600
+    })
     
     return {"message": "Test tokens set successfully"}
\ No newline at end of file
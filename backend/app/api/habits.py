@@ -1,17 +1,28 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from sqlmodel import Session, select
-from datetime import date
-from typing import List, Optional
-from ..database import get_session
+from datetime import date, datetime
+from typing import List, Optional, Tuple
+from ..database import get_session, insert_on_conflict
 from ..models import Habit, HabitEntry
-from ..schemas import HabitCreate, HabitUpdate, HabitResponse, HabitEntryCreate, HabitEntryResponse
-from ..core.scoring import calculate_daily_scores
+from ..schemas import HabitCreate, HabitUpdate, HabitResponse, HabitEntryCreate, HabitEntryResponse, HabitEntrySubmitResponse
+from ..core.recompute_queue import score_recompute_queue
+from ..core.backfill import backfill_scores
+from ..core.cache import summary_cache, weekly_progress_cache
+from ..core.completions import record_completions
 
 router = APIRouter(prefix="/api/habits", tags=["habits"])
 
+# Habit fields that change how existing entries are scored
+SCORING_FIELDS = {
+    "weight", "target_days_per_week", "nonzero_threshold", "goal_threshold",
+    "stretch_threshold", "compound_rate", "decay_rate", "forgiveness_days",
+    "is_inverted", "is_active"
+}
+
 
 @router.get("/", response_model=List[HabitResponse])
-async def list_habits(session: Session = Depends(get_session)):
+def list_habits(session: Session = Depends(get_session)):
     """List all active habits with current configuration."""
     statement = select(Habit).where(Habit.is_active == True)
     habits = session.exec(statement).all()
@@ -19,18 +30,25 @@ async def list_habits(session: Session = Depends(get_session)):
 
 
 @router.post("/", response_model=HabitResponse)
-async def create_habit(habit: HabitCreate, session: Session = Depends(get_session)):
+def create_habit(habit: HabitCreate, session: Session = Depends(get_session)):
     """Create a new habit."""
     db_habit = Habit(**habit.dict())
     session.add(db_habit)
     session.commit()
+    summary_cache.clear()
+    weekly_progress_cache.clear()
     session.refresh(db_habit)
     return db_habit
 
 
 @router.put("/{habit_id}", response_model=HabitResponse)
-async def update_habit(habit_id: int, habit_update: HabitUpdate, session: Session = Depends(get_session)):
-    """Update habit configuration."""
+def update_habit(
+    habit_id: int,
+    habit_update: HabitUpdate,
+    rescore: bool = True,
+    session: Session = Depends(get_session)
+):
+    """Update habit configuration, rescoring full history when scoring settings change."""
     statement = select(Habit).where(Habit.id == habit_id)
     db_habit = session.exec(statement).first()
     
@@ -44,12 +62,18 @@ async def update_habit(habit_id: int, habit_update: HabitUpdate, session: Sessio
     
     session.add(db_habit)
     session.commit()
+    summary_cache.clear()
+    weekly_progress_cache.clear()
+    
+    if rescore and SCORING_FIELDS.intersection(update_data):
+        backfill_scores(session)
+    
     session.refresh(db_habit)
     return db_habit
 
 
 @router.delete("/{habit_id}")
-async def deactivate_habit(habit_id: int, session: Session = Depends(get_session)):
+def deactivate_habit(habit_id: int, session: Session = Depends(get_session)):
     """Deactivate a habit (soft delete)."""
     statement = select(Habit).where(Habit.id == habit_id)
     db_habit = session.exec(statement).first()
@@ -60,13 +84,28 @@ async def deactivate_habit(habit_id: int, session: Session = Depends(get_session
     db_habit.is_active = False
     session.add(db_habit)
     session.commit()
+    summary_cache.clear()
+    weekly_progress_cache.clear()
     
     return {"message": "Habit deactivated successfully"}
 
 
-@router.post("/entries", response_model=HabitEntryResponse)
-async def create_habit_entry(entry: HabitEntryCreate, session: Session = Depends(get_session)):
-    """Submit daily habit data."""
+@router.post("/entries", response_model=HabitEntrySubmitResponse)
+async def create_habit_entry(entry: HabitEntryCreate, wait: bool = True, session: Session = Depends(get_session)):
+    """Submit daily habit data. With wait=false, scores are recomputed in the background."""
+    db_entry = await run_in_threadpool(upsert_habit_entry, session, entry)
+    
+    # Recalculate scores for this date and carry the change forward
+    try:
+        scores_pending = await score_recompute_queue.submit(entry.date, wait=wait)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to recalculate scores: {str(e)}")
+    
+    return HabitEntrySubmitResponse(**db_entry.dict(), scores_pending=scores_pending)
+
+
+def upsert_habit_entry(session: Session, entry: HabitEntryCreate) -> HabitEntry:
+    """Create or update one habit entry and return the stored row."""
     # Check if habit exists and is active
     habit_statement = select(Habit).where(Habit.id == entry.habit_id, Habit.is_active == True)
     habit = session.exec(habit_statement).first()
@@ -74,34 +113,23 @@ async def create_habit_entry(entry: HabitEntryCreate, session: Session = Depends
     if not habit:
         raise HTTPException(status_code=404, detail="Active habit not found")
     
-    # Check if entry already exists for this date
-    existing_statement = select(HabitEntry).where(
+    # Create the entry, or update the value if one exists for this date
+    upsert_statement = insert_on_conflict(session, HabitEntry, ["habit_id", "date"], ["value"])
+    session.execute(upsert_statement, dict(entry.dict(), created_at=datetime.utcnow()))
+    written = [(entry.habit_id, entry.date, entry.value)]
+    record_completions(session, written)
+    session.commit()
+    weekly_progress_cache.clear()
+    
+    entry_statement = select(HabitEntry).where(
         HabitEntry.habit_id == entry.habit_id,
         HabitEntry.date == entry.date
     )
-    existing_entry = session.exec(existing_statement).first()
-    
-    if existing_entry:
-        # Update existing entry
-        existing_entry.value = entry.value
-        session.add(existing_entry)
-        db_entry = existing_entry
-    else:
-        # Create new entry
-        db_entry = HabitEntry(**entry.dict())
-        session.add(db_entry)
-    
-    session.commit()
-    session.refresh(db_entry)
-    
-    # Recalculate scores for this date
-    calculate_daily_scores(session, entry.date)
-    
-    return db_entry
+    return session.exec(entry_statement).one()
 
 
 @router.get("/entries", response_model=List[HabitEntryResponse])
-async def get_habit_entries(entry_date: Optional[date] = None, session: Session = Depends(get_session)):
+def get_habit_entries(entry_date: Optional[date] = None, session: Session = Depends(get_session)):
     """Get habit entries for a specific date or all entries."""
     statement = select(HabitEntry)
     
@@ -113,48 +141,73 @@ async def get_habit_entries(entry_date: Optional[date] = None, session: Session
 
 
 @router.post("/entries/batch")
-async def create_habit_entries_batch(entries: List[HabitEntryCreate], session: Session = Depends(get_session)):
-    """Submit multiple habit entries at once."""
-    created_entries = []
-    dates_to_recalculate = set()
+async def create_habit_entries_batch(
+    entries: List[HabitEntryCreate],
+    wait: bool = True,
+    session: Session = Depends(get_session)
+):
+    """Submit multiple habit entries at once. With wait=false, scores are recomputed in the background."""
+    if not entries:
+        return {"message": "Successfully created/updated 0 entries", "created": 0, "updated": 0, "scores_pending": False}
+    
+    dates, updated_count = await run_in_threadpool(upsert_habit_entries, session, entries)
+    
+    # Recalculate scores from the earliest affected date in a single pass
+    try:
+        scores_pending = await score_recompute_queue.submit(min(dates), changed_through=max(dates), wait=wait)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to recalculate scores: {str(e)}")
+    
+    return {
+        "message": f"Successfully created/updated {len(dates)} entries",
+        "created": len(dates) - updated_count,
+        "updated": updated_count,
+        "scores_pending": scores_pending
+    }
+
+
+def upsert_habit_entries(session: Session, entries: List[HabitEntryCreate]) -> Tuple[List[date], int]:
+    """
+    Create or update a batch of habit entries in one statement.
+    Returns the date of each distinct entry written and how many already existed.
+    """
+    # Check all habits exist and are active in one query
+    habit_ids = {entry_data.habit_id for entry_data in entries}
+    habit_statement = select(Habit.id).where(Habit.id.in_(habit_ids), Habit.is_active == True)
+    active_habit_ids = set(session.exec(habit_statement).all())
     
     for entry_data in entries:
-        # Check if habit exists and is active
-        habit_statement = select(Habit).where(Habit.id == entry_data.habit_id, Habit.is_active == True)
-        habit = session.exec(habit_statement).first()
-        
-        if not habit:
+        if entry_data.habit_id not in active_habit_ids:
             raise HTTPException(status_code=404, detail=f"Active habit not found for ID {entry_data.habit_id}")
-        
-        # Check if entry already exists
-        existing_statement = select(HabitEntry).where(
-            HabitEntry.habit_id == entry_data.habit_id,
-            HabitEntry.date == entry_data.date
-        )
-        existing_entry = session.exec(existing_statement).first()
-        
-        if existing_entry:
-            existing_entry.value = entry_data.value
-            session.add(existing_entry)
-            created_entries.append(existing_entry)
-        else:
-            db_entry = HabitEntry(**entry_data.dict())
-            session.add(db_entry)
-            created_entries.append(db_entry)
-        
-        dates_to_recalculate.add(entry_data.date)
     
-    session.commit()
+    # Later entries for the same habit and date win
+    created_at = datetime.utcnow()
+    rows = {
+        (entry_data.habit_id, entry_data.date): dict(entry_data.dict(), created_at=created_at)
+        for entry_data in entries
+    }
+    dates = [entry_date for _, entry_date in rows]
+    
+    existing_statement = select(HabitEntry.habit_id, HabitEntry.date).where(
+        HabitEntry.habit_id.in_(habit_ids),
+        HabitEntry.date >= min(dates),
+        HabitEntry.date <= max(dates)
+    )
+    existing_keys = {tuple(key) for key in session.exec(existing_statement)}
+    updated_count = len(existing_keys.intersection(rows))
     
-    # Recalculate scores for all affected dates
-    for calc_date in dates_to_recalculate:
-        calculate_daily_scores(session, calc_date)
+    upsert_statement = insert_on_conflict(session, HabitEntry, ["habit_id", "date"], ["value"])
+    session.execute(upsert_statement, list(rows.values()))
+    written = [(row["habit_id"], row["date"], row["value"]) for row in rows.values()]
+    record_completions(session, written)
+    session.commit()
+    weekly_progress_cache.clear()
     
-    return {"message": f"Successfully created/updated {len(created_entries)} entries"}
+    return dates, updated_count
 
 
 @router.get("/entries/{habit_id}", response_model=List[HabitEntryResponse])
-async def get_habit_entries_by_id(habit_id: int, days: int = 30, session: Session = Depends(get_session)):
+def get_habit_entries_by_id(habit_id: int, days: int = 30, session: Session = Depends(get_session)):
     """Get entries for a specific habit over the last N days."""
     from datetime import datetime, timedelta
     
@@ -3,6 +3,7 @@ from sqlmodel import Session
 from datetime import date, timedelta
 from ..database import get_session
 from ..core.notifications import send_daily_reminder, get_weekly_progress
+from ..core.scheduler import job_scheduler
 from ..config import settings
 
 router = APIRouter(prefix="/api/notifications", tags=["notifications"])
@@ -45,7 +46,7 @@ async def check_email_settings():
 
 
 @router.get("/weekly-progress")
-async def get_current_weekly_progress(session: Session = Depends(get_session)):
+def get_current_weekly_progress(session: Session = Depends(get_session)):
     """Get the current weekly progress for all habits."""
     today = date.today()
     progress = get_weekly_progress(session, today)
@@ -61,12 +62,21 @@ async def get_current_weekly_progress(session: Session = Depends(get_session)):
 async def schedule_notifications():
     """Information about scheduling daily notifications."""
     return {
-        "message": "To schedule daily notifications, set up a cron job or task scheduler",
-        "recommended_time": "8:45 AM MST (15:45 UTC)",
-        "cron_expression": "45 15 * * *",
-        "example_commands": {
-            "unix_cron": "45 15 * * * /usr/bin/python3 -c \"from app.core.notifications import schedule_daily_reminder; schedule_daily_reminder()\"",
-            "windows_task": "Create a Windows Task to run the Python script daily at 8:45 AM MST"
-        },
+        "message": "Daily tasks run on the app's built-in scheduler while it is running",
+        "enabled": settings.scheduler_enabled,
+        "timezone": settings.timezone,
+        "whoop_sync_time": settings.whoop_sync_time,
+        "daily_reminder_time": settings.daily_reminder_time,
+        "configuration": "Set SCHEDULER_ENABLED, WHOOP_SYNC_TIME, DAILY_REMINDER_TIME and TIMEZONE environment variables",
+        "job_status": "Use GET /api/notifications/jobs to see last runs and durations",
         "manual_trigger": "Use POST /api/notifications/test-email to manually trigger"
-    }
\ No newline at end of file
+    }
+
+
+@router.get("/jobs")
+def get_scheduled_jobs():
+    """Get the schedule, last run and recent run durations of each daily job."""
+    return {
+        "running": job_scheduler.running,
+        "jobs": job_scheduler.status()
+    }
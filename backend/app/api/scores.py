@@ -4,15 +4,20 @@ from datetime import date, timedelta
 from typing import List, Optional
 from ..database import get_session
 from ..models import DailyScore, HabitScore, Habit
-from ..schemas import DailyScoreResponse, HabitScoreResponse
-from ..core.scoring import calculate_daily_scores
+from ..schemas import DailyScoreResponse, HabitScoreResponse, WeeklyScoreResponse
+from ..core.scoring import recalculate_score_range
+from ..core.backfill import backfill_scores
 from ..core.momentum import get_all_momentum_status
+from ..core.cache import summary_cache
+from ..core.streaks import get_streaks
+from ..core.aggregates import get_weekly_scores
+from ..core.score_index import cumulative_index
 
 router = APIRouter(prefix="/api/scores", tags=["scores"])
 
 
 @router.get("/daily", response_model=List[DailyScoreResponse])
-async def get_daily_scores(
+def get_daily_scores(
     start_date: Optional[date] = None, 
     end_date: Optional[date] = None, 
     days: Optional[int] = None,
@@ -39,8 +44,24 @@ async def get_daily_scores(
     return scores
 
 
+@router.get("/weekly", response_model=List[WeeklyScoreResponse])
+def get_weekly_score_totals(weeks: int = 12, session: Session = Depends(get_session)):
+    """Get total and average daily score for each of the last N calendar weeks."""
+    weekly_scores = get_weekly_scores(session, date.today(), weeks)
+    
+    return [
+        WeeklyScoreResponse(
+            week_start=weekly.week_start,
+            total_score=weekly.total_score,
+            scored_days=weekly.scored_days,
+            average_score=weekly.total_score / weekly.scored_days if weekly.scored_days else 0.0
+        )
+        for weekly in weekly_scores
+    ]
+
+
 @router.get("/habits/{habit_id}", response_model=List[HabitScoreResponse])
-async def get_habit_performance(
+def get_habit_performance(
     habit_id: int, 
     days: int = 30, 
     session: Session = Depends(get_session)
@@ -65,28 +86,35 @@ async def get_habit_performance(
 
 
 @router.post("/recalculate")
-async def recalculate_scores(
+def recalculate_scores(
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
+    full_history: bool = False,
     session: Session = Depends(get_session)
 ):
-    """Trigger score recalculation for a date range."""
+    """Trigger score recalculation for a date range, or rebuild all history."""
+    if full_history:
+        try:
+            recalculated_dates = backfill_scores(session, start_date, end_date)
+        except Exception as e:
+            session.rollback()
+            raise HTTPException(status_code=500, detail=f"Failed to rebuild scores: {str(e)}")
+        
+        return {
+            "message": f"Rebuilt scores for {len(recalculated_dates)} dates",
+            "dates": recalculated_dates
+        }
+    
     if not start_date:
         start_date = date.today() - timedelta(days=30)
     if not end_date:
         end_date = date.today()
     
-    recalculated_dates = []
-    current_date = start_date
-    
-    while current_date <= end_date:
-        try:
-            calculate_daily_scores(session, current_date)
-            recalculated_dates.append(current_date)
-        except Exception as e:
-            print(f"Failed to recalculate scores for {current_date}: {str(e)}")
-        
-        current_date += timedelta(days=1)
+    try:
+        recalculated_dates = recalculate_score_range(session, start_date, end_date)
+    except Exception as e:
+        session.rollback()
+        raise HTTPException(status_code=500, detail=f"Failed to recalculate scores: {str(e)}")
     
     return {
         "message": f"Recalculated scores for {len(recalculated_dates)} dates",
@@ -95,10 +123,14 @@ async def recalculate_scores(
 
 
 @router.get("/summary")
-async def get_scores_summary(session: Session = Depends(get_session)):
+def get_scores_summary(session: Session = Depends(get_session)):
     """Get current momentum, streaks, and weekly progress summary."""
     today = date.today()
     
+    cached_summary = summary_cache.get(today)
+    if cached_summary is not None:
+        return cached_summary
+    
     # Get today's score if available
     today_statement = select(DailyScore).where(DailyScore.date == today)
     today_score = session.exec(today_statement).first()
@@ -132,24 +164,13 @@ async def get_scores_summary(session: Session = Depends(get_session)):
     prev_week_scores = session.exec(prev_week_statement).all()
     prev_week_avg = sum(s.final_score for s in prev_week_scores) / len(prev_week_scores) if prev_week_scores else 0
     
-    # Calculate longest streak
-    statement = select(DailyScore).where(DailyScore.date <= today).order_by(DailyScore.date.desc())
-    all_scores = session.exec(statement).all()
-    
-    longest_streak = 0
-    current_streak = 0
+    # Streaks come from the maintained run table rather than a history scan
+    current_streak, longest_streak = get_streaks(session, today)
     
-    for score in all_scores:
-        if score.final_score > 0:
-            current_streak += 1
-            longest_streak = max(longest_streak, current_streak)
-        else:
-            current_streak = 0
-    
-    return {
+    summary = {
         "today_score": today_score.final_score if today_score else None,
         "yesterday_score": yesterday_score.final_score if yesterday_score else None,
-        "cumulative_score": today_score.cumulative_score if today_score else (yesterday_score.cumulative_score if yesterday_score else 0),
+        "cumulative_score": cumulative_index.cumulative(session, today),
         "current_week_average": current_week_avg,
         "previous_week_average": prev_week_avg,
         "week_over_week_change": ((current_week_avg - prev_week_avg) / prev_week_avg * 100) if prev_week_avg > 0 else 0,
@@ -157,10 +178,13 @@ async def get_scores_summary(session: Session = Depends(get_session)):
         "longest_streak": longest_streak,
         "momentum_status": momentum_status
     }
+    
+    summary_cache.set(today, summary)
+    return summary
 
 
 @router.get("/habits", response_model=List[HabitScoreResponse])
-async def get_all_habit_scores(target_date: Optional[date] = None, session: Session = Depends(get_session)):
+def get_all_habit_scores(target_date: Optional[date] = None, session: Session = Depends(get_session)):
     """Get scores for all habits on a specific date."""
     if not target_date:
         target_date = date.today()
@@ -171,7 +195,7 @@ async def get_all_habit_scores(target_date: Optional[date] = None, session: Sess
 
 
 @router.get("/trends")
-async def get_score_trends(days: int = 30, session: Session = Depends(get_session)):
+def get_score_trends(days: int = 30, session: Session = Depends(get_session)):
     """Get scoring trends and analytics."""
     start_date = date.today() - timedelta(days=days-1)
     
@@ -213,7 +237,8 @@ async def get_score_trends(days: int = 30, session: Session = Depends(get_sessio
             "average_score": avg_score,
             "max_score": max_score,
             "min_score": min_score,
-            "total_cumulative": daily_scores[-1].cumulative_score if daily_scores else 0
+            "total_cumulative": cumulative_index.cumulative(session, daily_scores[-1].date),
+            "period_total": cumulative_index.total(session, start_date, date.today())
         },
         "best_day": {
             "date": best_day.date,
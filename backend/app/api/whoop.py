@@ -1,10 +1,13 @@
+import asyncio
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from sqlmodel import Session, select
 from datetime import date, timedelta
 from typing import List, Optional
-from ..database import get_session
+from ..database import get_session, run_in_session
 from ..models import WhoopData
 from ..utils.whoop_client import WhoopClient
+from ..core.whoop_sync import get_sync_start_date, sync_whoop_range
 from ..api.auth import whoop_tokens
 
 router = APIRouter(prefix="/api/whoop", tags=["whoop"])
@@ -13,10 +16,11 @@ router = APIRouter(prefix="/api/whoop", tags=["whoop"])
 @router.get("/test-auth")
 async def test_whoop_auth():
     """Test WHOOP authentication and API access."""
-    if not whoop_tokens.get("access_token"):
+    tokens = await run_in_threadpool(whoop_tokens.snapshot)
+    if not tokens.get("access_token"):
         raise HTTPException(status_code=401, detail="WHOOP not connected")
     
-    client = WhoopClient(whoop_tokens["access_token"])
+    client = WhoopClient(tokens["access_token"], tokens=whoop_tokens)
     
     try:
         # Test basic profile access
@@ -32,79 +36,25 @@ async def test_whoop_auth():
 
 
 @router.post("/sync")
-async def sync_whoop_data(days: int = 30, session: Session = Depends(get_session)):
-    """Fetch latest WHOOP data and sync to database."""
-    if not whoop_tokens.get("access_token"):
+async def sync_whoop_data(days: int = 30, full: bool = False):
+    """
+    Fetch latest WHOOP data and sync to database. Unless full is set, the
+    window starts from the last sync's cursor and unchanged records are skipped.
+    """
+    tokens = await run_in_threadpool(whoop_tokens.snapshot)
+    if not tokens.get("access_token"):
         raise HTTPException(status_code=401, detail="WHOOP not connected")
     
-    client = WhoopClient(whoop_tokens["access_token"])
+    client = WhoopClient(tokens["access_token"], tokens=whoop_tokens)
     
     # Calculate date range
     end_date = date.today()
     start_date = end_date - timedelta(days=days-1)
+    if not full:
+        start_date = await run_in_threadpool(run_in_session, get_sync_start_date, start_date)
     
     try:
-        # Fetch data from WHOOP API
-        recovery_data = await client.get_recovery_data(start_date, end_date)
-        sleep_data = await client.get_sleep_data(start_date, end_date)
-        hrv_data = await client.get_hrv_data(start_date, end_date)
-        
-        synced_dates = []
-        
-        # Process recovery data (v2 API structure)
-        if recovery_data and "records" in recovery_data:
-            for record in recovery_data["records"]:
-                # v2 API: use created_at as the date reference
-                if "created_at" in record:
-                    record_date = date.fromisoformat(record["created_at"].split("T")[0])
-                else:
-                    continue  # Skip records without date
-                
-                # Extract scores from v2 API structure
-                recovery_score = record.get("score", {}).get("recovery_score")
-                hrv_score = record.get("score", {}).get("hrv_rmssd_milli")
-                
-                # Get sleep score from sleep data for the same date
-                sleep_score = None
-                if sleep_data and "records" in sleep_data:
-                    for sleep_record in sleep_data["records"]:
-                        # v2 API: use start timestamp for sleep records
-                        if "start" in sleep_record and sleep_record["start"]:
-                            sleep_date = date.fromisoformat(sleep_record["start"].split("T")[0])
-                            if sleep_date == record_date:
-                                # Use sleep_performance_percentage as the sleep score (0-100%)
-                                sleep_score = sleep_record.get("score", {}).get("sleep_performance_percentage")
-                                break
-                
-                # Calculate WHOOP multiplier
-                whoop_multiplier = calculate_whoop_multiplier_from_scores(
-                    sleep_score, hrv_score, recovery_score
-                )
-                
-                # Check if record already exists
-                existing_statement = select(WhoopData).where(WhoopData.date == record_date)
-                existing = session.exec(existing_statement).first()
-                
-                if existing:
-                    # Update existing record
-                    existing.sleep_score = sleep_score
-                    existing.hrv_score = hrv_score
-                    existing.recovery_score = recovery_score
-                    existing.whoop_multiplier = whoop_multiplier
-                else:
-                    # Create new record
-                    whoop_record = WhoopData(
-                        date=record_date,
-                        sleep_score=sleep_score,
-                        hrv_score=hrv_score,
-                        recovery_score=recovery_score,
-                        whoop_multiplier=whoop_multiplier
-                    )
-                    session.add(whoop_record)
-                
-                synced_dates.append(record_date)
-        
-        session.commit()
+        synced_dates = await sync_whoop_range(client, start_date, end_date)
         
         return {
             "message": f"Successfully synced WHOOP data for {len(synced_dates)} dates",
@@ -120,7 +70,7 @@ async def sync_whoop_data(days: int = 30, session: Session = Depends(get_session
 
 
 @router.get("/data")
-async def get_whoop_data(
+def get_whoop_data(
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
     days: int = 30,
@@ -147,15 +97,18 @@ async def get_whoop_data(
 @router.get("/debug/raw-data")
 async def debug_raw_whoop_data(days: int = 3):
     """Debug endpoint to see raw WHOOP API responses."""
-    if not whoop_tokens.get("access_token"):
+    tokens = await run_in_threadpool(whoop_tokens.snapshot)
+    if not tokens.get("access_token"):
         raise HTTPException(status_code=401, detail="WHOOP not connected")
     
-    client = WhoopClient(whoop_tokens["access_token"])
+    client = WhoopClient(tokens["access_token"], tokens=whoop_tokens)
     end_date = date.today()
     start_date = end_date - timedelta(days=days-1)
     
-    recovery_data = await client.get_recovery_data(start_date, end_date)
-    sleep_data = await client.get_sleep_data(start_date, end_date)
+    recovery_data, sleep_data = await asyncio.gather(
+        client.get_recovery_data(start_date, end_date),
+        client.get_sleep_data(start_date, end_date)
+    )
     
     return {
         "date_range": {"start": start_date, "end": end_date},
@@ -165,7 +118,7 @@ async def debug_raw_whoop_data(days: int = 3):
 
 
 @router.get("/status")
-async def get_whoop_sync_status(session: Session = Depends(get_session)):
+def get_whoop_sync_status(session: Session = Depends(get_session)):
     """Get WHOOP data sync status and coverage."""
     if not whoop_tokens.get("access_token"):
         return {
@@ -201,37 +154,3 @@ async def get_whoop_sync_status(session: Session = Depends(get_session)):
         "missing_dates": missing_dates,
         "total_records": len(coverage_data)
     }
-
-
-def calculate_whoop_multiplier_from_scores(sleep_score: Optional[float], hrv_score: Optional[float], recovery_score: Optional[float]) -> float:
-    """
-    Calculate WHOOP multiplier from individual scores.
-    Sleep and recovery scores are percentages (0-100).
-    HRV is in milliseconds and needs normalization.
-    """
-    valid_scores = []
-    
-    if sleep_score is not None:
-        # Sleep performance percentage is already 0-100%
-        valid_scores.append(sleep_score)
-    
-    if hrv_score is not None:
-        # HRV score normalization (this is highly individual, using rough estimates)
-        # Typical HRV ranges from 20-100ms, normalize to percentage
-        hrv_percentage = min(hrv_score / 50 * 100, 100)  # Rough normalization
-        valid_scores.append(hrv_percentage)
-    
-    if recovery_score is not None:
-        # Recovery score is already a percentage (0-100)
-        valid_scores.append(recovery_score)
-    
-    if not valid_scores:
-        return 1.0
-    
-    average_score = sum(valid_scores) / len(valid_scores)
-    
-    # Linear scaling around 70%
-    multiplier = average_score / 70.0
-    
-    # Cap the multiplier between 0.5 and 2.0
-    return max(0.5, min(multiplier, 2.0))
\ No newline at end of file
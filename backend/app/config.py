@@ -10,6 +10,9 @@ env_file_path = Path(__file__).parent.parent.parent / ".env"
 if env_file_path.exists():
     load_dotenv(env_file_path)
 
+# Placeholder secret key shipped in the defaults and the README
+DEFAULT_SECRET_KEY = "your-secret-key-change-this-in-production"
+
 
 class Settings(BaseSettings):
     database_url: str = "sqlite:///./upward_habits.db"
@@ -17,6 +20,16 @@ class Settings(BaseSettings):
     whoop_client_id: Optional[str] = None
     whoop_client_secret: Optional[str] = None
     whoop_redirect_uri: str = "http://localhost:8000/api/auth/whoop/callback"
+    whoop_api_base_url: str = "https://api.prod.whoop.com"
+    whoop_max_retries: int = 5
+    whoop_backoff_seconds: float = 1.0
+    whoop_backoff_max_seconds: float = 60.0
+    whoop_requests_per_minute: int = 100
+    # Raw WHOOP responses are unencrypted health data, so the disk cache is
+    # opt-in (e.g. ./data/whoop_cache) and files expire after the retention
+    whoop_cache_dir: str = ""
+    whoop_cache_ttl_seconds: float = 900.0
+    whoop_cache_retention_days: int = 90
     
     smtp_server: Optional[str] = None
     smtp_port: int = 587
@@ -24,10 +37,20 @@ class Settings(BaseSettings):
     smtp_password: Optional[str] = None
     notification_email: Optional[str] = None
     
-    secret_key: str = "your-secret-key-change-this-in-production"
+    secret_key: str = DEFAULT_SECRET_KEY
     debug: bool = True
     timezone: str = "America/Phoenix"
     
+    # Daily jobs run by the in-process scheduler, as HH:MM in the timezone above
+    scheduler_enabled: bool = True
+    whoop_sync_time: str = "08:40"
+    daily_reminder_time: str = "08:45"
+    
+    score_recompute_debounce_seconds: float = 2.0
+    summary_cache_ttl_seconds: float = 300.0
+    token_cache_ttl_seconds: float = 30.0
+    whoop_sync_overlap_days: int = 2
+    
     def __init__(self, **kwargs):
         # Override with environment variables if available
         kwargs.setdefault('whoop_client_id', os.getenv('WHOOP_CLIENT_ID'))
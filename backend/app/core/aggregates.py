@@ -0,0 +1,91 @@
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Tuple
+from sqlmodel import Session, select, delete
+from ..database import insert_on_conflict
+from ..models import DailyScore, WeeklyScore
+from .streaks import refresh_streaks, rebuild_streaks
+
+
+def get_week_start(day: date) -> date:
+    """Monday of the week containing day."""
+    return day - timedelta(days=day.weekday())
+
+
+def _weekly_rows(scores: Iterable[Tuple[date, float]], weeks: Iterable[date]) -> List[Dict]:
+    totals = {week_start: [0.0, 0] for week_start in weeks}
+    
+    for score_date, final_score in scores:
+        week_total = totals.setdefault(get_week_start(score_date), [0.0, 0])
+        week_total[0] += final_score
+        week_total[1] += 1
+    
+    updated_at = datetime.utcnow()
+    return [
+        {"week_start": week_start, "total_score": total_score, "scored_days": scored_days, "updated_at": updated_at}
+        for week_start, (total_score, scored_days) in sorted(totals.items())
+    ]
+
+
+def refresh_weekly_scores(session: Session, start_date: date, end_date: date):
+    """
+    Recompute the weekly totals of every week touched by daily scores
+    rewritten between start_date and end_date. Does not commit.
+    """
+    first_week = get_week_start(start_date)
+    last_week = get_week_start(end_date)
+    weeks = [first_week + timedelta(weeks=offset) for offset in range((last_week - first_week).days // 7 + 1)]
+    
+    scores_statement = select(DailyScore.date, DailyScore.final_score).where(
+        DailyScore.date >= first_week,
+        DailyScore.date <= last_week + timedelta(days=6)
+    )
+    rows = _weekly_rows(session.exec(scores_statement), weeks)
+    
+    upsert_statement = insert_on_conflict(session, WeeklyScore, ["week_start"], ["total_score", "scored_days", "updated_at"])
+    session.execute(upsert_statement, rows)
+
+
+def refresh_aggregates(session: Session, start_date: date, end_date: date, habit_ids: Iterable[int] = ()):
+    """
+    Bring streak runs and weekly totals up to date after scores between
+    start_date and end_date were written. Does not commit.
+    """
+    refresh_streaks(session, start_date, end_date, habit_ids)
+    refresh_weekly_scores(session, start_date, end_date)
+
+
+def rebuild_aggregates(session: Session):
+    """
+    Rebuild all streak runs and weekly totals from the full score history.
+    """
+    rebuild_streaks(session)
+    
+    session.execute(delete(WeeklyScore))
+    scores_statement = select(DailyScore.date, DailyScore.final_score).order_by(DailyScore.date)
+    rows = _weekly_rows(session.exec(scores_statement), [])
+    if rows:
+        session.execute(insert_on_conflict(session, WeeklyScore, ["week_start"], ["total_score", "scored_days", "updated_at"]), rows)
+    
+    session.commit()
+
+
+def ensure_aggregates(session: Session):
+    """
+    Build aggregates for databases that have scores but no aggregates yet.
+    """
+    if session.exec(select(WeeklyScore.id)).first() is None and session.exec(select(DailyScore.id)).first() is not None:
+        rebuild_aggregates(session)
+
+
+def get_weekly_scores(session: Session, current_date: date, weeks: int) -> List[WeeklyScore]:
+    """
+    Get weekly totals for the last N weeks up to the week containing current_date.
+    """
+    last_week = get_week_start(current_date)
+    
+    statement = select(WeeklyScore).where(
+        WeeklyScore.week_start > last_week - timedelta(weeks=weeks),
+        WeeklyScore.week_start <= last_week
+    ).order_by(WeeklyScore.week_start)
+    
+    return session.exec(statement).all()
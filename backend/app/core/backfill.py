@@ -0,0 +1,164 @@
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+import numpy as np
+from sqlmodel import Session, select, func
+from ..models import Habit, HabitEntry, HabitScore, DailyScore
+from .score_index import cumulative_index
+from .scoring import RECALCULATE_CHUNK_SIZE, commit_score_writes, load_momentum, load_whoop_multipliers, momentum_transition, upsert_score_rows
+
+
+def backfill_scores(session: Session, start_date: Optional[date] = None, end_date: Optional[date] = None) -> List[date]:
+    """
+    Rebuild habit and daily scores over a long range with NumPy.
+    Entries are loaded into dense (habit x day) arrays, raw score tiers and
+    rolling 7-day completion are computed with vectorized operations and only
+    the momentum recurrence is stepped day by day. Defaults to the full entry
+    history through today. Returns the recalculated dates.
+    """
+    habits_statement = select(Habit).where(Habit.is_active == True).order_by(Habit.id)
+    habits = session.exec(habits_statement).all()
+    habit_ids = [habit.id for habit in habits]
+    
+    if not habits:
+        return []
+    if start_date is None:
+        first_entry_statement = select(func.min(HabitEntry.date)).where(HabitEntry.habit_id.in_(habit_ids))
+        start_date = session.exec(first_entry_statement).first()
+        if start_date is None:
+            return []
+    if end_date is None:
+        end_date = date.today()
+    if end_date < start_date:
+        return []
+    
+    previous_date = start_date - timedelta(days=1)
+    window_start = start_date - timedelta(days=6)
+    days = (end_date - start_date).days + 1
+    habit_index = {habit_id: index for index, habit_id in enumerate(habit_ids)}
+    
+    # Dense entry arrays; completion counts include the six days before start_date
+    values = np.full((len(habits), days), np.nan)
+    completed_counts = np.zeros((len(habits), days + 6), dtype=np.int64)
+    
+    entries_statement = select(HabitEntry.habit_id, HabitEntry.date, HabitEntry.value).where(
+        HabitEntry.habit_id.in_(habit_ids),
+        HabitEntry.date >= window_start,
+        HabitEntry.date <= end_date
+    )
+    for habit_id, entry_date, value in session.execute(entries_statement):
+        row = habit_index[habit_id]
+        offset = (entry_date - window_start).days
+        if value > 0:
+            completed_counts[row, offset] += 1
+        if offset >= 6 and np.isnan(values[row, offset - 6]):
+            values[row, offset - 6] = value
+    
+    def column(attribute: str) -> np.ndarray:
+        return np.array([[float(getattr(habit, attribute))] for habit in habits])
+    
+    nonzero = column("nonzero_threshold")
+    goal = column("goal_threshold")
+    stretch = column("stretch_threshold")
+    is_inverted = np.array([[habit.is_inverted] for habit in habits])
+    
+    # Raw score tiers, mirroring calculate_raw_score
+    with np.errstate(invalid="ignore"):
+        regular_scores = np.select(
+            [values == 0, values >= stretch, values >= goal, values >= nonzero],
+            [0.0, 1.5, 1.0, 0.3],
+            default=0.0
+        )
+        inverted_scores = np.select(
+            [values >= nonzero, values <= stretch, values <= goal],
+            [0.0, 1.5, 1.0],
+            default=0.3
+        )
+    raw_scores = np.where(np.isnan(values), 0.0, np.where(is_inverted, inverted_scores, regular_scores))
+    
+    # Rolling 7-day completion counts from cumulative sums
+    counts_cumsum = np.concatenate(
+        [np.zeros((len(habits), 1), dtype=np.int64), np.cumsum(completed_counts, axis=1)], axis=1
+    )
+    completed_days = counts_cumsum[:, 7:] - counts_cumsum[:, :-7]
+    completion_rates = completed_days / 7.0
+    
+    # Each habit's momentum transition for every possible weekly count
+    transitions = np.array([
+        [momentum_transition(habit, count / 7.0) for count in range(8)] for habit in habits
+    ])
+    rows = np.arange(len(habits))[:, np.newaxis]
+    factors, lower_bounds, upper_bounds = (transitions[rows, completed_days, part] for part in range(3))
+    
+    momentum = np.ones(len(habits))
+    for habit_id, multiplier in load_momentum(session, habits, previous_date).items():
+        momentum[habit_index[habit_id]] = multiplier
+    
+    momentum_multipliers = np.empty((len(habits), days))
+    for offset in range(days):
+        momentum = np.minimum(
+            np.maximum(momentum * factors[:, offset], lower_bounds[:, offset]),
+            upper_bounds[:, offset]
+        )
+        momentum_multipliers[:, offset] = momentum
+    
+    final_habit_scores = raw_scores * momentum_multipliers
+    
+    # Daily aggregation
+    weights = column("weight")
+    total_weight = float(weights.sum())
+    weighted_scores = (final_habit_scores * weights).sum(axis=0)
+    base_scores = weighted_scores / total_weight if total_weight > 0 else np.zeros(days)
+    
+    whoop_multipliers = np.ones(days)
+    for whoop_date, whoop_multiplier in load_whoop_multipliers(session, start_date, end_date).items():
+        whoop_multipliers[(whoop_date - start_date).days] = whoop_multiplier
+    
+    final_scores = base_scores * whoop_multipliers
+    
+    previous_cumulative = cumulative_index.cumulative(session, previous_date)
+    cumulative_scores = np.cumsum(np.concatenate([[previous_cumulative], final_scores]))[1:]
+    
+    # Write results in chunks
+    created_at = datetime.utcnow()
+    dates = [start_date + timedelta(days=offset) for offset in range(days)]
+    
+    for row, habit in enumerate(habits):
+        raw_row = raw_scores[row].tolist()
+        momentum_row = momentum_multipliers[row].tolist()
+        final_row = final_habit_scores[row].tolist()
+        completion_row = completion_rates[row].tolist()
+        
+        for chunk_start in range(0, days, RECALCULATE_CHUNK_SIZE):
+            upsert_score_rows(session, HabitScore, [
+                {
+                    "habit_id": habit.id,
+                    "date": dates[offset],
+                    "raw_score": raw_row[offset],
+                    "momentum_multiplier": momentum_row[offset],
+                    "final_score": final_row[offset],
+                    "weekly_completion_rate": completion_row[offset],
+                    "created_at": created_at
+                }
+                for offset in range(chunk_start, min(chunk_start + RECALCULATE_CHUNK_SIZE, days))
+            ])
+    
+    base_list = base_scores.tolist()
+    whoop_list = whoop_multipliers.tolist()
+    final_list = final_scores.tolist()
+    cumulative_list = cumulative_scores.tolist()
+    
+    for chunk_start in range(0, days, RECALCULATE_CHUNK_SIZE):
+        upsert_score_rows(session, DailyScore, [
+            {
+                "date": dates[offset],
+                "base_score": base_list[offset],
+                "whoop_multiplier": whoop_list[offset],
+                "final_score": final_list[offset],
+                "cumulative_score": cumulative_list[offset],
+                "created_at": created_at
+            }
+            for offset in range(chunk_start, min(chunk_start + RECALCULATE_CHUNK_SIZE, days))
+        ])
+    
+    commit_score_writes(session, start_date, end_date, habit_ids)
+    return dates
@@ -0,0 +1,41 @@
+import threading
+import time
+from typing import Any, Dict, Hashable, Optional, Tuple
+from ..config import settings
+
+
+class TTLCache:
+    """Small thread-safe in-process cache whose entries expire after a TTL."""
+    
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[Hashable, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            
+            return value
+    
+    def set(self, key: Hashable, value: Any):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Cached /api/scores/summary payloads keyed by date, cleared whenever scores change
+summary_cache = TTLCache(settings.summary_cache_ttl_seconds)
+
+# Weekly progress payloads keyed by date, cleared whenever entries or habits change
+weekly_progress_cache = TTLCache(settings.summary_cache_ttl_seconds)
@@ -0,0 +1,135 @@
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, Iterator, Tuple
+from sqlmodel import Session, select
+from ..database import insert_on_conflict
+from ..models import HabitCompletion, HabitEntry
+
+# Bytes needed for one bit per day of a leap year
+YEAR_BYTES = 46
+
+# Completion bitsets keyed by (habit_id, year)
+Bitsets = Dict[Tuple[int, int], int]
+
+
+def day_of_year(day: date) -> int:
+    """Bit position of a date within its year's bitset."""
+    return day.timetuple().tm_yday - 1
+
+
+def decode_bits(bits: bytes) -> int:
+    return int.from_bytes(bits, "little")
+
+
+def encode_bits(bitset: int) -> bytes:
+    return bitset.to_bytes(YEAR_BYTES, "little")
+
+
+def completed_dates(year: int, bitset: int) -> Iterator[date]:
+    """Yield the dates set in one year's bitset, lowest bit first."""
+    while bitset:
+        lowest_bit = bitset & -bitset
+        yield date(year, 1, 1) + timedelta(days=lowest_bit.bit_length() - 1)
+        bitset ^= lowest_bit
+
+
+def _upsert_bitsets(session: Session, bitsets: Bitsets):
+    updated_at = datetime.utcnow()
+    rows = [
+        {"habit_id": habit_id, "year": year, "bits": encode_bits(bitset), "updated_at": updated_at}
+        for (habit_id, year), bitset in bitsets.items()
+    ]
+    
+    upsert_statement = insert_on_conflict(session, HabitCompletion, ["habit_id", "year"], ["bits", "updated_at"])
+    session.execute(upsert_statement, rows)
+
+
+def load_bitsets(session: Session, habit_ids: Iterable[int], start_date: date, end_date: date) -> Bitsets:
+    """
+    Load the stored completion bitsets of several habits for every year from
+    start_date through end_date in one query. Years without completions are omitted.
+    """
+    statement = select(HabitCompletion.habit_id, HabitCompletion.year, HabitCompletion.bits).where(
+        HabitCompletion.habit_id.in_(list(habit_ids)),
+        HabitCompletion.year >= start_date.year,
+        HabitCompletion.year <= end_date.year
+    )
+    
+    return {(habit_id, year): decode_bits(bits) for habit_id, year, bits in session.exec(statement)}
+
+
+def count_completed(bitsets: Bitsets, habit_id: int, start_date: date, end_date: date) -> int:
+    """Number of days from start_date through end_date the habit was completed."""
+    completed_days = 0
+    
+    for year in range(start_date.year, end_date.year + 1):
+        first_bit = day_of_year(max(start_date, date(year, 1, 1)))
+        last_bit = day_of_year(min(end_date, date(year, 12, 31)))
+        mask = ((1 << (last_bit - first_bit + 1)) - 1) << first_bit
+        completed_days += bin(bitsets.get((habit_id, year), 0) & mask).count("1")
+    
+    return completed_days
+
+
+def record_completions(session: Session, entries: Iterable[Tuple[int, date, float]]):
+    """
+    Set or clear the bits of written (habit_id, date, value) entries and
+    store the affected habit-years. Does not commit: call it in the same
+    transaction as the entry writes, so concurrent writers are serialized
+    by the database and never overwrite each other's bits.
+    """
+    changes: Dict[Tuple[int, int], Dict[int, bool]] = defaultdict(dict)
+    for habit_id, entry_date, value in entries:
+        changes[(habit_id, entry_date.year)][day_of_year(entry_date)] = value > 0
+    
+    if not changes:
+        return
+    
+    # Start from the stored bits so writes from other processes are kept
+    stored_statement = select(HabitCompletion).where(
+        HabitCompletion.habit_id.in_({habit_id for habit_id, _ in changes}),
+        HabitCompletion.year.in_({year for _, year in changes})
+    )
+    stored = {(row.habit_id, row.year): decode_bits(row.bits) for row in session.exec(stored_statement)}
+    
+    bitsets = {}
+    for key, bits in changes.items():
+        bitset = stored.get(key, 0)
+        for bit, completed in bits.items():
+            if completed:
+                bitset |= 1 << bit
+            else:
+                bitset &= ~(1 << bit)
+        bitsets[key] = bitset
+    
+    _upsert_bitsets(session, bitsets)
+
+
+def rebuild_completions(session: Session):
+    """
+    Rebuild every habit's completion bitsets from its entries. Commits.
+    """
+    entries_statement = select(HabitEntry.habit_id, HabitEntry.date).where(HabitEntry.value > 0)
+    
+    bitsets: Bitsets = defaultdict(int)
+    for habit_id, entry_date in session.exec(entries_statement):
+        bitsets[(habit_id, entry_date.year)] |= 1 << day_of_year(entry_date)
+    
+    if bitsets:
+        _upsert_bitsets(session, bitsets)
+        session.commit()
+
+
+def ensure_completions(session: Session):
+    """
+    Build completion bitsets for databases that have entries but no bitsets yet.
+    """
+    if session.exec(select(HabitCompletion.id)).first() is None and session.exec(select(HabitEntry.id)).first() is not None:
+        rebuild_completions(session)
+
+
+def get_completed_days(session: Session, habit_id: int, target_date: date, days: int = 7) -> int:
+    """Days completed in the window of the given length ending on target_date."""
+    start_date = target_date - timedelta(days=days - 1)
+    bitsets = load_bitsets(session, [habit_id], start_date, target_date)
+    return count_completed(bitsets, habit_id, start_date, target_date)
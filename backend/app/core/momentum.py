@@ -1,25 +1,38 @@
 from datetime import date, timedelta
 from typing import Dict, List
 from sqlmodel import Session, select
-from ..models import Habit, HabitScore
+from ..models import Habit
+from .momentum_tree import momentum_index
+from .streaks import get_habit_streak, get_habit_streaks
 
 
 def get_momentum_status(session: Session, habit_id: int, current_date: date) -> Dict:
     """
     Get current momentum status for a habit including trend analysis.
     """
-    # Get last 14 days of scores to analyze trend
-    start_date = current_date - timedelta(days=13)
+    habit = session.get(Habit, habit_id)
+    if not habit:
+        return summarize_momentum([], 0)
     
-    statement = select(HabitScore).where(
-        HabitScore.habit_id == habit_id,
-        HabitScore.date >= start_date,
-        HabitScore.date <= current_date
-    ).order_by(HabitScore.date)
+    # Multipliers of the last 7 days from the habit's transition tree
+    dates = [current_date - timedelta(days=offset) for offset in range(6, -1, -1)]
+    multipliers = momentum_index.get_momentum(session, [habit], dates).get(habit_id, [])
     
-    scores = session.exec(statement).all()
+    if not multipliers:
+        return summarize_momentum(multipliers, 0)
     
-    if not scores:
+    # Streak of consecutive days with a positive raw score, from the maintained runs
+    streak_days = get_habit_streak(session, habit_id, current_date)
+    
+    return summarize_momentum(multipliers, streak_days)
+
+
+def summarize_momentum(multipliers: List[float], streak_days: int) -> Dict:
+    """
+    Build a habit's momentum status from its date-ordered momentum
+    multipliers over the last 7 days and its current streak.
+    """
+    if not multipliers:
         return {
             "status": "no_data",
             "current_multiplier": 1.0,
@@ -27,11 +40,10 @@ def get_momentum_status(session: Session, habit_id: int, current_date: date) ->
             "streak_days": 0
         }
     
-    current_score = scores[-1] if scores else None
-    current_multiplier = current_score.momentum_multiplier if current_score else 1.0
+    current_multiplier = multipliers[-1]
     
     # Analyze trend over last 7 days
-    recent_multipliers = [score.momentum_multiplier for score in scores[-7:]]
+    recent_multipliers = multipliers[-7:]
     
     if len(recent_multipliers) >= 2:
         if recent_multipliers[-1] > recent_multipliers[0] * 1.05:
@@ -43,14 +55,6 @@ def get_momentum_status(session: Session, habit_id: int, current_date: date) ->
     else:
         trend = "stable"
     
-    # Calculate streak (consecutive days with positive momentum)
-    streak_days = 0
-    for score in reversed(scores):
-        if score.raw_score > 0:
-            streak_days += 1
-        else:
-            break
-    
     # Determine status based on current multiplier
     if current_multiplier >= 1.5:
         status = "excellent"
@@ -73,14 +77,23 @@ def get_momentum_status(session: Session, habit_id: int, current_date: date) ->
 
 def get_all_momentum_status(session: Session, current_date: date) -> Dict:
     """
-    Get momentum status for all active habits.
+    Get momentum status for all active habits, reading every habit's last
+    7 days of momentum from its transition tree and its streak in one query.
     """
     statement = select(Habit).where(Habit.is_active == True)
     habits = session.exec(statement).all()
     
+    dates = [current_date - timedelta(days=offset) for offset in range(6, -1, -1)]
+    multipliers = momentum_index.get_momentum(session, habits, dates)
+    
+    streaks = get_habit_streaks(session, [habit.id for habit in habits], current_date)
+    
     momentum_data = {}
     
     for habit in habits:
-        momentum_data[habit.name] = get_momentum_status(session, habit.id, current_date)
+        momentum_data[habit.name] = summarize_momentum(
+            multipliers.get(habit.id, []),
+            streaks.get(habit.id, 0)
+        )
     
-    return momentum_data
\ No newline at end of file
+    return momentum_data
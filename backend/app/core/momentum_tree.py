@@ -0,0 +1,216 @@
+import math
+import threading
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Dict, List
+from sqlmodel import Session, select, func
+from ..models import Habit, HabitEntry, HabitScore
+from .completions import completed_dates, load_bitsets
+from .scoring import IDENTITY, Transition, apply_transition, momentum_transition
+
+# Smallest composed scale, so long decays never underflow to 0. Once the
+# scale is this small the floor of the decaying tier decides the result.
+MIN_SCALE = 1e-300
+
+# Habit settings the daily transitions depend on
+MOMENTUM_FIELDS = ("target_days_per_week", "forgiveness_days", "compound_rate", "decay_rate")
+
+# Days of room kept past today so the trees are not rebuilt every day
+TREE_HEADROOM_DAYS = 366
+
+
+def compose_transitions(first: Transition, second: Transition) -> Transition:
+    """
+    The single transition equal to applying first, then second. Scaling by a
+    positive factor is monotonic, so the clamp bounds carry through.
+    Unbounded ends are composed directly, as scaling an infinity by an
+    underflowed scale would give NaN.
+    """
+    scale, floor, cap = first
+    return (
+        max(scale * second[0], MIN_SCALE),
+        min(second[1], second[2]) if floor == -math.inf else apply_transition(second, floor),
+        second[2] if cap == math.inf else apply_transition(second, cap)
+    )
+
+
+class TransitionTree:
+    """
+    Segment tree over a sequence of daily transitions. Replacing one
+    transition and composing any prefix both take O(log n).
+    """
+    
+    def __init__(self, transitions: List[Transition]):
+        self.length = len(transitions)
+        self.size = 1
+        while self.size < max(self.length, 1):
+            self.size *= 2
+        
+        self.nodes = [IDENTITY] * (2 * self.size)
+        self.nodes[self.size:self.size + self.length] = transitions
+        for node in range(self.size - 1, 0, -1):
+            self.nodes[node] = compose_transitions(self.nodes[2 * node], self.nodes[2 * node + 1])
+    
+    def update(self, index: int, transition: Transition):
+        node = self.size + index
+        self.nodes[node] = transition
+        
+        node //= 2
+        while node:
+            self.nodes[node] = compose_transitions(self.nodes[2 * node], self.nodes[2 * node + 1])
+            node //= 2
+    
+    def prefix(self, count: int) -> Transition:
+        """Compose the first count transitions in order."""
+        left_part, right_part = IDENTITY, IDENTITY
+        low, high = self.size, self.size + count
+        
+        while low < high:
+            if low % 2:
+                left_part = compose_transitions(left_part, self.nodes[low])
+                low += 1
+            if high % 2:
+                high -= 1
+                right_part = compose_transitions(self.nodes[high], right_part)
+            low //= 2
+            high //= 2
+        
+        return compose_transitions(left_part, right_part)
+
+
+class HabitMomentum:
+    """
+    Daily transitions of one habit from start_date through end_date,
+    starting from a momentum of 1.0 the day before start_date.
+    """
+    
+    def __init__(self, habit: Habit, start_date: date, end_date: date, bitsets: Dict[int, int]):
+        # Detached copy, so the tree outlives the session that loaded the habit
+        self.habit = Habit(**habit.dict())
+        self.start_date = start_date
+        self.end_date = end_date
+        self.bitsets = dict(bitsets)
+        self.completed = {
+            completed_date for year, bitset in bitsets.items() for completed_date in completed_dates(year, bitset)
+        }
+        self.tree = TransitionTree([
+            self._transition(start_date + timedelta(days=offset))
+            for offset in range((end_date - start_date).days + 1)
+        ])
+    
+    def _transition(self, current_date: date) -> Transition:
+        completed_days = sum(
+            1 for offset in range(7) if current_date - timedelta(days=offset) in self.completed
+        )
+        return momentum_transition(self.habit, completed_days / 7.0)
+    
+    def matches(self, habit: Habit, start_date: date, end_date: date) -> bool:
+        """Whether the tree still fits a habit's stored configuration and date range."""
+        return (
+            self.start_date == start_date
+            and end_date <= self.end_date
+            and all(getattr(self.habit, field) == getattr(habit, field) for field in MOMENTUM_FIELDS)
+        )
+    
+    def set_completed(self, entry_date: date, completed: bool):
+        """Record a changed entry and update the seven transitions whose window includes it."""
+        if completed:
+            self.completed.add(entry_date)
+        else:
+            self.completed.discard(entry_date)
+        
+        for offset in range(7):
+            current_date = entry_date + timedelta(days=offset)
+            if self.start_date <= current_date <= self.end_date:
+                self.tree.update((current_date - self.start_date).days, self._transition(current_date))
+    
+    def sync(self, bitsets: Dict[int, int]):
+        """Apply the days whose stored completion bits differ from the tree's."""
+        for year in self.bitsets.keys() | bitsets.keys():
+            changed = self.bitsets.get(year, 0) ^ bitsets.get(year, 0)
+            for entry_date in completed_dates(year, changed):
+                self.set_completed(entry_date, entry_date not in self.completed)
+        
+        self.bitsets = dict(bitsets)
+    
+    def momentum_on(self, target_date: date) -> float:
+        if target_date < self.start_date:
+            return 1.0
+        
+        return apply_transition(self.tree.prefix((target_date - self.start_date).days + 1), 1.0)
+
+
+class MomentumIndex:
+    """
+    In-process cache of each habit's transition tree. Every read checks the
+    trees against the stored completion bitsets, first entry and first score
+    dates and habit configuration, so writes from any process or CLI are
+    picked up: changed days by point updates, anything else by a rebuild.
+    """
+    
+    def __init__(self):
+        self._habits: Dict[int, HabitMomentum] = {}
+        self._lock = threading.Lock()
+    
+    def _start_dates(self, session: Session, habit_ids: List[int]) -> Dict[int, date]:
+        # Start where the stored score history starts, so both chains share a starting point
+        start_dates: Dict[int, date] = {}
+        
+        for model in (HabitEntry, HabitScore):
+            statement = select(model.habit_id, func.min(model.date)).where(
+                model.habit_id.in_(habit_ids)
+            ).group_by(model.habit_id)
+            
+            for habit_id, first_date in session.exec(statement):
+                start_dates[habit_id] = min(start_dates.get(habit_id, first_date), first_date)
+        
+        return start_dates
+    
+    def get_momentum(self, session: Session, habits: List[Habit], dates: List[date]) -> Dict[int, List[float]]:
+        """
+        Momentum multipliers of each habit on each of the given dates, in
+        O(log n) per date once built. Dates before a habit's history starts
+        are skipped and habits without entries or scores are omitted.
+        """
+        if not habits or not dates:
+            return {}
+        
+        end_date = max(max(dates), date.today())
+        
+        with self._lock:
+            start_dates = self._start_dates(session, [habit.id for habit in habits])
+            if not start_dates:
+                return {}
+            
+            # Window counts reach six days back from the first transition
+            bitset_start = min(start_dates.values()) - timedelta(days=6)
+            tree_end = end_date + timedelta(days=TREE_HEADROOM_DAYS)
+            bitsets: Dict[int, Dict[int, int]] = defaultdict(dict)
+            for (habit_id, year), bitset in load_bitsets(session, start_dates, bitset_start, tree_end).items():
+                bitsets[habit_id][year] = bitset
+            
+            momentum = {}
+            for habit in habits:
+                start_date = start_dates.get(habit.id)
+                if start_date is None:
+                    self._habits.pop(habit.id, None)
+                    continue
+                
+                first_year = (start_date - timedelta(days=6)).year
+                habit_bitsets = {year: bitset for year, bitset in bitsets[habit.id].items() if year >= first_year}
+                
+                habit_momentum = self._habits.get(habit.id)
+                if habit_momentum is None or not habit_momentum.matches(habit, start_date, end_date):
+                    habit_momentum = HabitMomentum(habit, start_date, tree_end, habit_bitsets)
+                    self._habits[habit.id] = habit_momentum
+                else:
+                    habit_momentum.sync(habit_bitsets)
+                
+                momentum[habit.id] = [
+                    habit_momentum.momentum_on(target_date) for target_date in dates if target_date >= start_date
+                ]
+            
+            return momentum
+
+
+momentum_index = MomentumIndex()
@@ -2,18 +2,24 @@ import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import date, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 import asyncio
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import and_
 from sqlmodel import Session, select
 from ..config import settings
-from ..models import DailyScore, Habit, WhoopData
-from ..database import get_session
+from ..models import DailyScore, Habit, HabitCompletion
+from ..database import get_session, run_in_session
+from .cache import weekly_progress_cache
+from .completions import count_completed, decode_bits
 
 
 def create_daily_reminder_email(yesterday_score: Optional[float], weekly_progress: dict) -> str:
     """
     Create HTML content for daily reminder email.
     """
+    score_text = f"{yesterday_score:.2f}" if yesterday_score is not None else "No data"
+    
     html_content = f"""
     <html>
     <body>
@@ -21,7 +27,7 @@ def create_daily_reminder_email(yesterday_score: Optional[float], weekly_progres
         <p>Good morning! Time for your daily habit tracking.</p>
         
         <h3>Yesterday's Performance</h3>
-        <p>Final Score: {yesterday_score:.2f if yesterday_score else 'No data'}</p>
+        <p>Final Score: {score_text}</p>
         
         <h3>This Week's Progress</h3>
         <ul>
@@ -47,34 +53,71 @@ def create_daily_reminder_email(yesterday_score: Optional[float], weekly_progres
 
 def get_weekly_progress(session: Session, current_date: date) -> dict:
     """
-    Get weekly progress for all habits.
+    Get weekly progress for all habits, loading every active habit with its
+    completion bitsets for the week in one query. Today's progress is cached.
     """
+    cached_progress = weekly_progress_cache.get(current_date) if current_date == date.today() else None
+    if cached_progress is not None:
+        return cached_progress
+    
     week_start = current_date - timedelta(days=6)
     
-    statement = select(Habit).where(Habit.is_active == True)
-    habits = session.exec(statement).all()
+    # Outer join so habits without completed days this week still report 0
+    statement = select(
+        Habit.id,
+        Habit.name,
+        Habit.target_days_per_week,
+        HabitCompletion.year,
+        HabitCompletion.bits
+    ).outerjoin(HabitCompletion, and_(
+        HabitCompletion.habit_id == Habit.id,
+        HabitCompletion.year >= week_start.year,
+        HabitCompletion.year <= current_date.year
+    )).where(Habit.is_active == True).order_by(Habit.id)
     
-    progress = {}
+    habits = {}
+    bitsets = {}
+    for habit_id, name, target_days, year, bits in session.exec(statement):
+        habits[habit_id] = (name, target_days)
+        if bits is not None:
+            bitsets[(habit_id, year)] = decode_bits(bits)
     
-    for habit in habits:
-        # Count completed days this week
-        from ..models import HabitEntry
-        entry_statement = select(HabitEntry).where(
-            HabitEntry.habit_id == habit.id,
-            HabitEntry.date >= week_start,
-            HabitEntry.date <= current_date,
-            HabitEntry.value > 0
-        )
-        completed_entries = session.exec(entry_statement).all()
-        
-        progress[habit.name] = {
-            'completed_days': len(completed_entries),
-            'target_days': habit.target_days_per_week
+    progress = {
+        name: {
+            'completed_days': count_completed(bitsets, habit_id, week_start, current_date),
+            'target_days': target_days
         }
+        for habit_id, (name, target_days) in habits.items()
+    }
+    
+    if current_date == date.today():
+        weekly_progress_cache.set(current_date, progress)
     
     return progress
 
 
+def load_reminder_data(today: date) -> Tuple[Optional[float], dict]:
+    """
+    Get yesterday's final score and this week's progress for the reminder.
+    """
+    with next(get_session()) as session:
+        # Get yesterday's score
+        score_statement = select(DailyScore).where(DailyScore.date == today - timedelta(days=1))
+        yesterday_score_record = session.exec(score_statement).first()
+        yesterday_score = yesterday_score_record.final_score if yesterday_score_record else None
+        
+        # Get weekly progress
+        return yesterday_score, get_weekly_progress(session, today)
+
+
+def deliver_email(msg: MIMEMultipart):
+    """Send a message through the configured SMTP server."""
+    with smtplib.SMTP(settings.smtp_server, settings.smtp_port) as server:
+        server.starttls()
+        server.login(settings.smtp_username, settings.smtp_password)
+        server.send_message(msg)
+
+
 async def send_daily_reminder():
     """
     Send daily reminder email with yesterday's score and weekly progress.
@@ -86,16 +129,7 @@ async def send_daily_reminder():
     try:
         # Get data for email
         today = date.today()
-        yesterday = today - timedelta(days=1)
-        
-        with next(get_session()) as session:
-            # Get yesterday's score
-            score_statement = select(DailyScore).where(DailyScore.date == yesterday)
-            yesterday_score_record = session.exec(score_statement).first()
-            yesterday_score = yesterday_score_record.final_score if yesterday_score_record else None
-            
-            # Get weekly progress
-            weekly_progress = get_weekly_progress(session, today)
+        yesterday_score, weekly_progress = await run_in_threadpool(load_reminder_data, today)
         
         # Create email content
         html_content = create_daily_reminder_email(yesterday_score, weekly_progress)
@@ -109,16 +143,14 @@ async def send_daily_reminder():
         html_part = MIMEText(html_content, 'html')
         msg.attach(html_part)
         
-        # Send email
-        with smtplib.SMTP(settings.smtp_server, settings.smtp_port) as server:
-            server.starttls()
-            server.login(settings.smtp_username, settings.smtp_password)
-            server.send_message(msg)
+        # Send email without blocking the event loop
+        await run_in_threadpool(deliver_email, msg)
         
         print(f"Daily reminder sent successfully to {settings.notification_email}")
         
     except Exception as e:
         print(f"Failed to send daily reminder: {str(e)}")
+        raise
 
 
 async def sync_whoop_data():
@@ -128,102 +160,62 @@ async def sync_whoop_data():
     try:
         # Import here to avoid circular imports
         from ..api.auth import whoop_tokens
-        from ..utils.whoop_client import WhoopClient
-        from ..api.whoop import calculate_whoop_multiplier_from_scores
+        from ..utils.whoop_client import WhoopClient, response_cache
+        from .whoop_sync import get_sync_start_date, sync_whoop_range
+        
+        # Drop raw responses past the retention, even when WHOOP is disconnected
+        if response_cache:
+            await run_in_threadpool(response_cache.purge, settings.whoop_cache_retention_days * 86400)
         
-        if not whoop_tokens.get("access_token"):
+        tokens = await run_in_threadpool(whoop_tokens.snapshot)
+        if not tokens.get("access_token"):
             print("WHOOP not connected, skipping sync")
             return
         
-        client = WhoopClient(whoop_tokens["access_token"])
+        client = WhoopClient(tokens["access_token"], tokens=whoop_tokens)
         
-        # Sync last 7 days to catch any updates
+        # Sync up to the last 7 days, resuming from the last sync's cursor
         end_date = date.today()
-        start_date = end_date - timedelta(days=6)
+        start_date = await run_in_threadpool(run_in_session, get_sync_start_date, end_date - timedelta(days=6))
         
         print(f"Syncing WHOOP data from {start_date} to {end_date}")
         
-        # Fetch data from WHOOP API
-        recovery_data = await client.get_recovery_data(start_date, end_date)
-        sleep_data = await client.get_sleep_data(start_date, end_date)
-        
-        synced_count = 0
-        
-        with next(get_session()) as session:
-            # Process recovery data
-            if recovery_data and "records" in recovery_data:
-                for record in recovery_data["records"]:
-                    if "created_at" not in record:
-                        continue
-                    
-                    record_date = date.fromisoformat(record["created_at"].split("T")[0])
-                    
-                    # Extract scores
-                    recovery_score = record.get("score", {}).get("recovery_score")
-                    hrv_score = record.get("score", {}).get("hrv_rmssd_milli")
-                    
-                    # Get matching sleep data
-                    sleep_score = None
-                    if sleep_data and "records" in sleep_data:
-                        for sleep_record in sleep_data["records"]:
-                            if "start" in sleep_record and sleep_record["start"]:
-                                sleep_date = date.fromisoformat(sleep_record["start"].split("T")[0])
-                                if sleep_date == record_date:
-                                    sleep_score = sleep_record.get("score", {}).get("sleep_performance_percentage")
-                                    break
-                    
-                    # Calculate multiplier
-                    whoop_multiplier = calculate_whoop_multiplier_from_scores(
-                        sleep_score, hrv_score, recovery_score
-                    )
-                    
-                    # Check if record exists
-                    existing_statement = select(WhoopData).where(WhoopData.date == record_date)
-                    existing = session.exec(existing_statement).first()
-                    
-                    if existing:
-                        # Update existing record
-                        existing.sleep_score = sleep_score
-                        existing.hrv_score = hrv_score
-                        existing.recovery_score = recovery_score
-                        existing.whoop_multiplier = whoop_multiplier
-                        print(f"Updated WHOOP data for {record_date}")
-                    else:
-                        # Create new record
-                        whoop_record = WhoopData(
-                            date=record_date,
-                            sleep_score=sleep_score,
-                            hrv_score=hrv_score,
-                            recovery_score=recovery_score,
-                            whoop_multiplier=whoop_multiplier
-                        )
-                        session.add(whoop_record)
-                        print(f"Added new WHOOP data for {record_date}")
-                    
-                    synced_count += 1
-            
-            session.commit()
-        
-        print(f"WHOOP sync completed: {synced_count} records processed")
+        synced_dates = await sync_whoop_range(client, start_date, end_date)
+        
+        print(f"WHOOP sync completed: {len(synced_dates)} records changed")
         
     except Exception as e:
         print(f"Failed to sync WHOOP data: {str(e)}")
+        raise
 
 
 def schedule_daily_reminder():
     """
-    Schedule daily reminder to be sent at 8:45 AM MST.
-    This would typically be called by a task scheduler or cron job.
+    Send the daily reminder once from outside the app. The app's own
+    scheduler sends it at settings.daily_reminder_time.
     """
     asyncio.run(send_daily_reminder())
 
 
 def schedule_daily_tasks():
     """
-    Run all daily scheduled tasks: WHOOP sync and habit reminder.
-    This would typically be called by a task scheduler or cron job.
+    Run all daily scheduled tasks once from outside the app: WHOOP sync and
+    habit reminder. The app's own scheduler runs them while it is up.
+    """
+    asyncio.run(run_standalone_daily_tasks())
+
+
+async def run_standalone_daily_tasks():
+    """
+    Run the daily tasks outside the app, closing the pooled WHOOP
+    HTTP client before the event loop goes away.
     """
-    asyncio.run(run_daily_tasks())
+    from ..utils.whoop_client import close_http_client
+    
+    try:
+        await run_daily_tasks()
+    finally:
+        await close_http_client()
 
 
 async def run_daily_tasks():
@@ -232,8 +224,12 @@ async def run_daily_tasks():
     """
     print("Starting daily scheduled tasks...")
     
-    # Sync WHOOP data first
-    await sync_whoop_data()
+    # Sync WHOOP data first; a failed sync is already logged and the
+    # reminder still goes out
+    try:
+        await sync_whoop_data()
+    except Exception:
+        pass
     
     # Then send daily reminder
     await send_daily_reminder()
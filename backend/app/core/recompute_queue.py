@@ -0,0 +1,138 @@
+import asyncio
+from contextlib import suppress
+from datetime import date
+from typing import List, Optional
+from fastapi.concurrency import run_in_threadpool
+from sqlmodel import Session
+from ..config import settings
+from ..database import engine
+from .scoring import propagate_score_changes
+
+
+def _propagate(start_date: date, changed_through: date):
+    with Session(engine) as session:
+        propagate_score_changes(session, start_date, changed_through=changed_through)
+
+
+class ScoreRecomputeQueue:
+    """
+    Background worker that coalesces dirty dates from many entry writes
+    and recomputes scores for the combined range once.
+    """
+    
+    def __init__(self, debounce_seconds: float):
+        self.debounce_seconds = debounce_seconds
+        self._start_date: Optional[date] = None
+        self._changed_through: Optional[date] = None
+        self._requested = 0
+        self._completed = 0
+        self._waiters: List[asyncio.Future] = []
+        self._task: Optional[asyncio.Task] = None
+    
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+    
+    @property
+    def pending(self) -> bool:
+        return self._completed < self._requested
+    
+    def start(self):
+        """Start the worker on the running event loop."""
+        if self.running:
+            return
+        
+        self._dirty = asyncio.Event()
+        self._flush = asyncio.Event()
+        self._done = asyncio.Condition()
+        self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        """Finish any queued recompute, then stop the worker."""
+        if not self.running:
+            return
+        
+        if self.pending:
+            self._flush.set()
+            await self._wait_for(self._requested)
+        
+        self._task.cancel()
+        with suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+    
+    async def submit(self, start_date: date, changed_through: Optional[date] = None, wait: bool = True) -> bool:
+        """
+        Queue a recompute starting at start_date for inputs changed through
+        changed_through. With wait, returns once scores are up to date and
+        raises if the recompute failed; otherwise returns immediately.
+        Returns True while scores are pending.
+        """
+        if changed_through is None:
+            changed_through = start_date
+        
+        if not self.running:
+            await run_in_threadpool(_propagate, start_date, changed_through)
+            return False
+        
+        self._start_date = start_date if self._start_date is None else min(self._start_date, start_date)
+        self._changed_through = (
+            changed_through if self._changed_through is None
+            else max(self._changed_through, changed_through)
+        )
+        self._requested += 1
+        generation = self._requested
+        self._dirty.set()
+        
+        if not wait:
+            return True
+        
+        # Skip the debounce delay for callers waiting on the result
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._flush.set()
+        await waiter
+        return False
+    
+    async def _wait_for(self, generation: int):
+        async with self._done:
+            await self._done.wait_for(lambda: self._completed >= generation)
+    
+    async def _run(self):
+        while True:
+            await self._dirty.wait()
+            
+            # Let quick successive writes pile up before recomputing
+            if not self._flush.is_set():
+                with suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(self._flush.wait(), timeout=self.debounce_seconds)
+            
+            start_date, changed_through = self._start_date, self._changed_through
+            generation = self._requested
+            waiters, self._waiters = self._waiters, []
+            self._start_date = self._changed_through = None
+            self._dirty.clear()
+            self._flush.clear()
+            
+            error = None
+            try:
+                await run_in_threadpool(_propagate, start_date, changed_through)
+            except Exception as e:
+                error = e
+                print(f"Failed to recompute scores from {start_date}: {str(e)}")
+            
+            # Hand the outcome to every caller waiting on this run
+            for waiter in waiters:
+                if waiter.done():
+                    continue
+                if error:
+                    waiter.set_exception(error)
+                else:
+                    waiter.set_result(None)
+            
+            async with self._done:
+                self._completed = generation
+                self._done.notify_all()
+
+
+score_recompute_queue = ScoreRecomputeQueue(settings.score_recompute_debounce_seconds)
@@ -0,0 +1,213 @@
+import asyncio
+from collections import deque
+from contextlib import suppress
+from datetime import datetime, time, timedelta, timezone
+from time import perf_counter
+from typing import Awaitable, Callable, Deque, Dict, List, Optional
+from zoneinfo import ZoneInfo
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import or_, update
+from sqlmodel import Session, select
+from ..config import settings
+from ..database import engine, insert_on_conflict
+from ..models import ScheduledJob
+
+# Longest single sleep between schedule checks, so clock and DST changes are picked up
+MAX_SLEEP_SECONDS = 60.0
+
+# Run durations kept in memory per job for monitoring
+RECENT_DURATIONS = 20
+
+
+def to_utc(moment: datetime) -> datetime:
+    """Convert an aware datetime to naive UTC, as stored in the database."""
+    return moment.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def latest_occurrence(run_time: time, now: datetime) -> datetime:
+    """The most recent daily occurrence of run_time at or before now, in now's timezone."""
+    occurrence = datetime.combine(now.date(), run_time, tzinfo=now.tzinfo)
+    if occurrence > now:
+        occurrence = datetime.combine(now.date() - timedelta(days=1), run_time, tzinfo=now.tzinfo)
+    return occurrence
+
+
+def next_occurrence(run_time: time, now: datetime) -> datetime:
+    """The first daily occurrence of run_time after now, in now's timezone."""
+    return datetime.combine(latest_occurrence(run_time, now).date() + timedelta(days=1), run_time, tzinfo=now.tzinfo)
+
+
+def register_job(name: str, run_time: time) -> Optional[datetime]:
+    """Create or update a job's row and return the occurrence its last run covered."""
+    with Session(engine) as session:
+        upsert_statement = insert_on_conflict(session, ScheduledJob, ["name"], ["run_time"])
+        session.execute(upsert_statement, {"name": name, "run_time": run_time.strftime("%H:%M")})
+        session.commit()
+        
+        statement = select(ScheduledJob.last_scheduled_for).where(ScheduledJob.name == name)
+        return session.exec(statement).first()
+
+
+def claim_job_run(name: str, scheduled_for: datetime, started_at: datetime) -> bool:
+    """
+    Mark a job as running for an occurrence unless a run already covered it.
+    The conditional update lets only one process claim each occurrence.
+    """
+    with Session(engine) as session:
+        claim_statement = update(ScheduledJob).where(
+            ScheduledJob.name == name,
+            or_(ScheduledJob.last_scheduled_for == None, ScheduledJob.last_scheduled_for < scheduled_for)
+        ).values(
+            last_scheduled_for=scheduled_for,
+            last_started_at=started_at,
+            last_status="running",
+            last_error=None
+        )
+        claimed = session.execute(claim_statement).rowcount == 1
+        session.commit()
+        return claimed
+
+
+def record_job_run(name: str, finished_at: datetime, duration: float, error: Optional[str]):
+    with Session(engine) as session:
+        record_statement = update(ScheduledJob).where(ScheduledJob.name == name).values(
+            last_finished_at=finished_at,
+            last_duration_seconds=duration,
+            last_status="failed" if error else "succeeded",
+            last_error=error
+        )
+        session.execute(record_statement)
+        session.commit()
+
+
+def get_job_states() -> Dict[str, ScheduledJob]:
+    with Session(engine) as session:
+        return {job.name: job for job in session.exec(select(ScheduledJob))}
+
+
+class DailyJob:
+    """An async task run once a day at run_time in the scheduler's timezone."""
+    
+    def __init__(self, name: str, run_time: time, func: Callable[[], Awaitable[None]]):
+        self.name = name
+        self.run_time = run_time
+        self.func = func
+        self.running = False
+        self.durations: Deque[float] = deque(maxlen=RECENT_DURATIONS)
+
+
+class JobScheduler:
+    """
+    In-process scheduler for daily jobs. Each job has its own loop, so a
+    job never overlaps itself and a slow job doesn't hold up the others.
+    Runs are recorded in the scheduled_jobs table: an occurrence missed
+    while the app was down is run once on startup, and an occurrence is
+    only ever claimed by one process.
+    """
+    
+    def __init__(self, timezone_name: str):
+        self.timezone = ZoneInfo(timezone_name)
+        self.jobs: Dict[str, DailyJob] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._started_at: Optional[datetime] = None
+        self._stopping: Optional[asyncio.Event] = None
+    
+    @property
+    def running(self) -> bool:
+        return any(not task.done() for task in self._tasks)
+    
+    def add_job(self, name: str, run_time: str, func: Callable[[], Awaitable[None]]):
+        """Register an async function to run daily at run_time, given as HH:MM."""
+        self.jobs[name] = DailyJob(name, time.fromisoformat(run_time), func)
+    
+    def start(self):
+        """Start every job's loop on the running event loop."""
+        if self.running:
+            return
+        
+        self._started_at = datetime.now(self.timezone)
+        self._stopping = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._run(job)) for job in self.jobs.values()]
+    
+    async def stop(self):
+        """Stop scheduling, letting runs already in progress finish."""
+        if not self.running:
+            return
+        
+        self._stopping.set()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+    
+    async def _run(self, job: DailyJob):
+        last_scheduled_for = await run_in_threadpool(register_job, job.name, job.run_time)
+        
+        while not self._stopping.is_set():
+            now = datetime.now(self.timezone)
+            scheduled_for = latest_occurrence(job.run_time, now)
+            
+            # Catch up on a missed occurrence, but not on ones from before the job was ever run
+            if last_scheduled_for is not None or scheduled_for >= self._started_at:
+                if last_scheduled_for is None or last_scheduled_for < to_utc(scheduled_for):
+                    await self.run_job(job, to_utc(scheduled_for))
+                    last_scheduled_for = to_utc(scheduled_for)
+            
+            now = datetime.now(self.timezone)
+            sleep_seconds = (next_occurrence(job.run_time, now) - now).total_seconds()
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._stopping.wait(), timeout=min(max(sleep_seconds, 0.0), MAX_SLEEP_SECONDS))
+    
+    async def run_job(self, job: DailyJob, scheduled_for: datetime):
+        """Run one occurrence of a job if no other run has claimed it, recording its duration."""
+        if job.running:
+            print(f"Job {job.name} is still running, skipping")
+            return
+        
+        started_at = datetime.utcnow()
+        if not await run_in_threadpool(claim_job_run, job.name, scheduled_for, started_at):
+            return
+        
+        job.running = True
+        started = perf_counter()
+        error = None
+        
+        try:
+            await job.func()
+        except Exception as e:
+            error = str(e)
+            print(f"Job {job.name} failed: {error}")
+        finally:
+            duration = perf_counter() - started
+            job.durations.append(duration)
+            job.running = False
+        
+        await run_in_threadpool(record_job_run, job.name, datetime.utcnow(), duration, error)
+        print(f"Job {job.name} finished in {duration:.2f}s")
+    
+    def status(self) -> List[Dict]:
+        """Schedule, last run and recent durations of every job."""
+        states = get_job_states()
+        now = datetime.now(self.timezone)
+        
+        jobs = []
+        for job in self.jobs.values():
+            state = states.get(job.name)
+            durations = list(job.durations)
+            jobs.append({
+                "name": job.name,
+                "run_time": job.run_time.strftime("%H:%M"),
+                "timezone": str(self.timezone),
+                "next_run_at": next_occurrence(job.run_time, now) if self.running else None,
+                "running": job.running,
+                "last_started_at": state.last_started_at if state else None,
+                "last_finished_at": state.last_finished_at if state else None,
+                "last_duration_seconds": state.last_duration_seconds if state else None,
+                "last_status": state.last_status if state else None,
+                "last_error": state.last_error if state else None,
+                "recent_durations": durations,
+                "average_duration_seconds": sum(durations) / len(durations) if durations else None
+            })
+        
+        return jobs
+
+
+job_scheduler = JobScheduler(settings.timezone)
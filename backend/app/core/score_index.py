@@ -0,0 +1,163 @@
+import threading
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+from sqlalchemy import update
+from sqlmodel import Session, select
+from ..models import DailyScore, ScoreVersion
+
+# Days of room kept past the last scored day so new days don't force a rebuild
+INDEX_HEADROOM_DAYS = 366
+
+# Primary key of the single ScoreVersion row
+SCORE_VERSION_ID = 1
+
+
+def read_score_version(session: Session) -> int:
+    version_statement = select(ScoreVersion.version).where(ScoreVersion.id == SCORE_VERSION_ID)
+    return session.exec(version_statement).first() or 0
+
+
+def bump_score_version(session: Session) -> int:
+    """
+    Count a score write in the current transaction and return the new
+    version. Writers are serialized by the database, so until the commit no
+    other write can share or skip past this version.
+    """
+    bump_statement = update(ScoreVersion).where(ScoreVersion.id == SCORE_VERSION_ID).values(
+        version=ScoreVersion.version + 1,
+        updated_at=datetime.utcnow()
+    )
+    if session.execute(bump_statement).rowcount == 0:
+        session.add(ScoreVersion(id=SCORE_VERSION_ID, version=1))
+        session.flush()
+    
+    return read_score_version(session)
+
+
+class FenwickTree:
+    """Binary indexed tree of floats with O(log n) point updates and prefix sums."""
+    
+    def __init__(self, values: List[float]):
+        self.size = len(values)
+        self.tree = [0.0] + list(values)
+        
+        for index in range(1, self.size + 1):
+            parent = index + (index & -index)
+            if parent <= self.size:
+                self.tree[parent] += self.tree[index]
+    
+    def add(self, index: int, delta: float):
+        index += 1
+        while index <= self.size:
+            self.tree[index] += delta
+            index += index & -index
+    
+    def prefix_sum(self, count: int) -> float:
+        """Sum of the first count values."""
+        total = 0.0
+        index = min(count, self.size)
+        while index > 0:
+            total += self.tree[index]
+            index -= index & -index
+        return total
+
+
+class CumulativeScoreIndex:
+    """
+    In-process prefix-sum index over DailyScore.final_score by date, so
+    cumulative totals and totals over any window take O(log n) and a
+    rewritten day only updates its own entry. Before answering, the index
+    compares its score version with the stored one and is rebuilt when
+    scores were written by another process.
+    """
+    
+    def __init__(self):
+        self.start_date: Optional[date] = None
+        self._scores: List[float] = []
+        self._version: Optional[int] = None
+        self._tree: Optional[FenwickTree] = None
+        self._lock = threading.Lock()
+    
+    def _rebuild(self, session: Session):
+        # Read the version first, so a write landing in between forces another rebuild
+        self._version = read_score_version(session)
+        scores_statement = select(DailyScore.date, DailyScore.final_score).order_by(DailyScore.date)
+        rows = session.exec(scores_statement).all()
+        
+        self.start_date = rows[0][0] if rows else date.today()
+        end_date = max(rows[-1][0] if rows else self.start_date, date.today())
+        self._scores = [0.0] * ((end_date - self.start_date).days + 1 + INDEX_HEADROOM_DAYS)
+        for score_date, final_score in rows:
+            self._scores[(score_date - self.start_date).days] = final_score
+        
+        self._tree = FenwickTree(self._scores)
+    
+    def _covers(self, start_date: date, end_date: date) -> bool:
+        return (
+            self._tree is not None
+            and start_date >= self.start_date
+            and (end_date - self.start_date).days < len(self._scores)
+        )
+    
+    def rebuild(self, session: Session):
+        """Load every daily score from the table."""
+        with self._lock:
+            self._rebuild(session)
+    
+    def refresh(self, session: Session, start_date: date, end_date: date, version: int):
+        """
+        Pick up daily scores rewritten between start_date and end_date by the
+        committed write that bumped the score version to version. Rebuilds
+        instead when another write came first. Does nothing until the index
+        is first built.
+        """
+        with self._lock:
+            if self._tree is None:
+                return
+            if version != self._version + 1 or not self._covers(start_date, end_date):
+                self._rebuild(session)
+                return
+            
+            scores_statement = select(DailyScore.date, DailyScore.final_score).where(
+                DailyScore.date >= start_date,
+                DailyScore.date <= end_date
+            )
+            stored = dict(session.exec(scores_statement).all())
+            
+            for offset in range((end_date - start_date).days + 1):
+                score_date = start_date + timedelta(days=offset)
+                index = (score_date - self.start_date).days
+                final_score = stored.get(score_date, 0.0)
+                
+                if final_score != self._scores[index]:
+                    self._tree.add(index, final_score - self._scores[index])
+                    self._scores[index] = final_score
+            
+            self._version = version
+    
+    def total(self, session: Session, start_date: Optional[date], end_date: date) -> float:
+        """
+        Sum of final scores from start_date through end_date, or from the
+        first scored day when start_date is None.
+        """
+        with self._lock:
+            if (
+                self._tree is None
+                or (end_date - self.start_date).days >= len(self._scores)
+                or read_score_version(session) != self._version
+            ):
+                self._rebuild(session)
+            
+            end_count = (end_date - self.start_date).days + 1
+            start_count = max((start_date - self.start_date).days, 0) if start_date else 0
+            if end_count <= start_count:
+                return 0.0
+            
+            return self._tree.prefix_sum(end_count) - self._tree.prefix_sum(start_count)
+    
+    def cumulative(self, session: Session, through_date: date) -> float:
+        """Cumulative score through a date: every final score up to and including it."""
+        return self.total(session, None, through_date)
+
+
+cumulative_index = CumulativeScoreIndex()
@@ -1,7 +1,27 @@
-from datetime import date, timedelta
-from typing import List, Tuple, Optional
+import math
+from collections import defaultdict, deque
+from datetime import date, datetime, timedelta
+from itertools import groupby
+from typing import Any, Dict, Iterable, Iterator, List, Tuple, Optional
 from sqlmodel import Session, select
+from ..database import insert_on_conflict
 from ..models import Habit, HabitEntry, HabitScore, DailyScore, WhoopData
+from .cache import summary_cache
+from .aggregates import refresh_aggregates
+from .completions import get_completed_days
+from .score_index import bump_score_version, cumulative_index
+
+
+# Stored and recomputed scores closer than this are considered converged
+SCORE_TOLERANCE = 1e-9
+
+# Number of score rows written per bulk statement during range recalculation
+RECALCULATE_CHUNK_SIZE = 500
+
+# A daily momentum transition m -> min(max(m * scale, floor), cap)
+Transition = Tuple[float, float, float]
+
+IDENTITY: Transition = (1.0, -math.inf, math.inf)
 
 
 def calculate_raw_score(habit: Habit, value: float) -> float:
@@ -33,23 +53,10 @@ def calculate_raw_score(habit: Habit, value: float) -> float:
 
 def get_weekly_completion_rate(session: Session, habit_id: int, target_date: date) -> float:
     """
-    Calculate completion rate for the 7 days leading up to target_date.
+    Calculate completion rate for the 7 days leading up to target_date,
+    counted from the habit's completion bitset.
     """
-    start_date = target_date - timedelta(days=6)
-    
-    statement = select(HabitEntry).where(
-        HabitEntry.habit_id == habit_id,
-        HabitEntry.date >= start_date,
-        HabitEntry.date <= target_date
-    )
-    entries = session.exec(statement).all()
-    
-    completed_days = 0
-    for entry in entries:
-        if entry.value > 0:
-            completed_days += 1
-    
-    return completed_days / 7.0
+    return get_completed_days(session, habit_id, target_date) / 7.0
 
 
 def calculate_weekly_performance_tier(completion_rate: float, target_rate: float, forgiveness_days: int) -> str:
@@ -73,47 +80,87 @@ def calculate_weekly_performance_tier(completion_rate: float, target_rate: float
 
 def calculate_momentum(session: Session, habit: Habit, current_date: date) -> float:
     """
-    Calculate momentum multiplier based on rolling 7-day performance.
+    Calculate momentum multiplier based on rolling 7-day performance, read
+    from the habit's transition tree in O(log n).
+    """
+    return load_momentum(session, [habit], current_date).get(habit.id, 1.0)
+
+
+def load_momentum(session: Session, habits: List[Habit], target_date: date) -> Dict[int, float]:
+    """
+    Load the momentum multiplier of several habits on a date from their
+    transition trees. Habits whose history starts after target_date are
+    omitted, as they start from 1.0.
+    """
+    # Import here to avoid circular imports
+    from .momentum_tree import momentum_index
+    
+    return {
+        habit_id: multipliers[0]
+        for habit_id, multipliers in momentum_index.get_momentum(session, habits, [target_date]).items()
+        if multipliers
+    }
+
+
+def momentum_transition(habit: Habit, completion_rate: float) -> Transition:
+    """
+    The daily momentum transition for a weekly completion rate: compound
+    above target, hold on target and decay with a floor below it.
     """
-    completion_rate = get_weekly_completion_rate(session, habit.id, current_date)
     performance_tier = calculate_weekly_performance_tier(
         completion_rate, habit.target_days_per_week, habit.forgiveness_days
     )
     
-    # Get previous momentum to apply compound/decay
-    previous_date = current_date - timedelta(days=1)
-    statement = select(HabitScore).where(
-        HabitScore.habit_id == habit.id,
-        HabitScore.date == previous_date
-    )
-    previous_score = session.exec(statement).first()
-    previous_momentum = previous_score.momentum_multiplier if previous_score else 1.0
-    
-    # Apply momentum rules
     if performance_tier == "exceed":
-        return min(previous_momentum * habit.compound_rate, 3.0)
+        return (habit.compound_rate, -math.inf, 3.0)
     elif performance_tier == "meet":
-        return previous_momentum
+        return IDENTITY
     elif performance_tier == "close":
-        return max(previous_momentum * habit.decay_rate, 0.5)
+        return (habit.decay_rate, 0.5, math.inf)
     elif performance_tier == "miss":
-        return max(previous_momentum * (habit.decay_rate ** 2), 0.3)
+        return (habit.decay_rate ** 2, 0.3, math.inf)
     else:  # fail
-        return max(previous_momentum * (habit.decay_rate ** 3), 0.1)
+        return (habit.decay_rate ** 3, 0.1, math.inf)
+
+
+def apply_transition(transition: Transition, momentum: float) -> float:
+    scale, floor, cap = transition
+    return min(max(momentum * scale, floor), cap)
 
 
-def calculate_whoop_multiplier(session: Session, target_date: date) -> float:
+def apply_momentum_rules(habit: Habit, previous_momentum: float, completion_rate: float) -> float:
     """
-    Calculate WHOOP multiplier based on average of sleep, HRV, and recovery scores.
-    Linear scaling: 70% = 1.0x, <70% = <1.0x, >70% = >1.0x
+    Compound or decay the previous momentum based on the weekly completion rate.
     """
-    statement = select(WhoopData).where(WhoopData.date == target_date)
-    whoop_data = session.exec(statement).first()
+    return apply_transition(momentum_transition(habit, completion_rate), previous_momentum)
+
+
+def calculate_whoop_multiplier_from_scores(sleep_score: Optional[float], hrv_score: Optional[float], recovery_score: Optional[float]) -> float:
+    """
+    Calculate WHOOP multiplier from individual scores.
+    Sleep and recovery scores are percentages (0-100).
+    HRV is in milliseconds and needs normalization.
+    """
+    valid_scores = []
+    
+    if sleep_score is not None:
+        # Sleep performance percentage is already 0-100%
+        valid_scores.append(sleep_score)
+    
+    if hrv_score is not None:
+        # HRV score normalization (this is highly individual, using rough estimates)
+        # Typical HRV ranges from 20-100ms, normalize to percentage
+        hrv_percentage = min(hrv_score / 50 * 100, 100)  # Rough normalization
+        valid_scores.append(hrv_percentage)
+    
+    if recovery_score is not None:
+        # Recovery score is already a percentage (0-100)
+        valid_scores.append(recovery_score)
     
-    if not whoop_data or not all([whoop_data.sleep_score, whoop_data.hrv_score, whoop_data.recovery_score]):
+    if not valid_scores:
         return 1.0
     
-    average_score = (whoop_data.sleep_score + whoop_data.hrv_score + whoop_data.recovery_score) / 3.0
+    average_score = sum(valid_scores) / len(valid_scores)
     
     # Linear scaling around 70%
     multiplier = average_score / 70.0
@@ -122,102 +169,411 @@ def calculate_whoop_multiplier(session: Session, target_date: date) -> float:
     return max(0.5, min(multiplier, 2.0))
 
 
+def load_whoop_multipliers(session: Session, start_date: date, end_date: date) -> Dict[date, float]:
+    """
+    Load the WHOOP multipliers stored at ingest for a date range in one query.
+    Rows stored without one fall back to the same formula.
+    """
+    statement = select(
+        WhoopData.date,
+        WhoopData.whoop_multiplier,
+        WhoopData.sleep_score,
+        WhoopData.hrv_score,
+        WhoopData.recovery_score
+    ).where(
+        WhoopData.date >= start_date,
+        WhoopData.date <= end_date
+    )
+    
+    return {
+        whoop_date: multiplier if multiplier is not None
+        else calculate_whoop_multiplier_from_scores(sleep_score, hrv_score, recovery_score)
+        for whoop_date, multiplier, sleep_score, hrv_score, recovery_score in session.exec(statement)
+    }
+
+
+def score_habit(habit: Habit, value: Optional[float], completion_rate: float, previous_momentum: float) -> Tuple[float, float, float]:
+    """
+    Score a single habit for one day from preloaded inputs.
+    Returns (raw_score, momentum_multiplier, final_score).
+    """
+    # No entry means 0 value
+    raw_score = calculate_raw_score(habit, value) if value is not None else 0.0
+    momentum_multiplier = apply_momentum_rules(habit, previous_momentum, completion_rate)
+    
+    return raw_score, momentum_multiplier, raw_score * momentum_multiplier
+
+
 def calculate_daily_scores(session: Session, target_date: date) -> float:
     """
     Complete daily scoring pipeline for a specific date.
     Returns the final daily score.
     """
+    recalculated = _recalculate_days(session, target_date, target_date)
+    return recalculated[-1][1]
+
+
+def propagate_score_changes(
+    session: Session,
+    start_date: date,
+    changed_through: Optional[date] = None,
+    end_date: Optional[date] = None
+) -> List[date]:
+    """
+    Recalculate scores after inputs between start_date and changed_through changed.
+    Momentum and cumulative scores build on earlier days, so every later day
+    up to end_date (default today) is walked in one pass, stopping early once the
+    recomputed values match what is already stored. Returns the recalculated dates.
+    """
+    if changed_through is None:
+        changed_through = start_date
+    if end_date is None:
+        end_date = max(date.today(), changed_through)
+    
+    # An entry affects the 7-day completion window of the six days after it,
+    # so stored values cannot be trusted to have converged before then
+    converge_after = changed_through + timedelta(days=6)
+    
+    recalculated = _recalculate_days(session, start_date, end_date, converge_after)
+    return [scored_date for scored_date, _ in recalculated]
+
+
+def _row_matches(stored, row: Dict[str, Any]) -> bool:
+    """
+    Check whether a stored score row already holds the recomputed values.
+    """
+    if stored is None:
+        return False
+    
+    for column, value in row.items():
+        if column in ("habit_id", "date", "created_at"):
+            continue
+        stored_value = getattr(stored, column)
+        if stored_value is None or abs(stored_value - value) > SCORE_TOLERANCE:
+            return False
+    
+    return True
+
+
+def _recalculate_days(
+    session: Session,
+    start_date: date,
+    end_date: date,
+    converge_after: Optional[date] = None
+) -> List[Tuple[date, float]]:
+    """
+    Score every day from start_date through end_date in a single pass.
+    All inputs are loaded in a fixed number of bulk queries and momentum and
+    cumulative state is carried forward in memory. When converge_after is set,
+    stops at the first day on or after it whose stored scores are unchanged.
+    Returns (date, final_score) for each day scored.
+    """
+    previous_date = start_date - timedelta(days=1)
+    window_start = start_date - timedelta(days=6)
+    
     # Get all active habits
     habits_statement = select(Habit).where(Habit.is_active == True)
     habits = session.exec(habits_statement).all()
+    habit_ids = [habit.id for habit in habits]
     
-    total_weighted_score = 0.0
-    total_weight = 0.0
+    # Entries for the range plus the completion window before it
+    entries_statement = select(HabitEntry).where(
+        HabitEntry.habit_id.in_(habit_ids),
+        HabitEntry.date >= window_start,
+        HabitEntry.date <= end_date
+    )
+    entry_values: Dict[Tuple[int, date], float] = {}
+    completed_counts: Dict[Tuple[int, date], int] = defaultdict(int)
+    for entry in session.exec(entries_statement):
+        key = (entry.habit_id, entry.date)
+        entry_values.setdefault(key, entry.value)
+        if entry.value > 0:
+            completed_counts[key] += 1
     
-    # Process each habit
-    for habit in habits:
-        # Get habit entry for the date
-        entry_statement = select(HabitEntry).where(
-            HabitEntry.habit_id == habit.id,
-            HabitEntry.date == target_date
+    # Previous day's momentum from the transition trees, so it never depends
+    # on a stored row, and any existing scores in the range
+    momentum = load_momentum(session, habits, previous_date)
+    
+    scores_statement = select(HabitScore).where(
+        HabitScore.habit_id.in_(habit_ids),
+        HabitScore.date >= start_date,
+        HabitScore.date <= end_date
+    )
+    existing_scores: Dict[Tuple[int, date], HabitScore] = {}
+    for score in session.exec(scores_statement):
+        existing_scores.setdefault((score.habit_id, score.date), score)
+    
+    daily_statement = select(DailyScore).where(
+        DailyScore.date >= start_date,
+        DailyScore.date <= end_date
+    )
+    daily_by_date = {daily.date: daily for daily in session.exec(daily_statement)}
+    
+    whoop_multipliers = load_whoop_multipliers(session, start_date, end_date)
+    
+    # Sum of every earlier final score, so a missing day never resets it
+    cumulative_score = cumulative_index.cumulative(session, previous_date)
+    
+    # Rolling count of completed days, primed with the six days before start_date
+    window_counts = {
+        habit.id: sum(
+            completed_counts.get((habit.id, start_date - timedelta(days=offset)), 0)
+            for offset in range(1, 7)
         )
-        entry = session.exec(entry_statement).first()
+        for habit in habits
+    }
+    
+    created_at = datetime.utcnow()
+    habit_score_rows: List[Dict[str, Any]] = []
+    daily_rows: List[Dict[str, Any]] = []
+    recalculated = []
+    current_date = start_date
+    
+    while current_date <= end_date:
+        unchanged = True
+        total_weighted_score = 0.0
+        total_weight = 0.0
         
-        if not entry:
-            # No entry means 0 value
-            raw_score = 0.0
-        else:
-            raw_score = calculate_raw_score(habit, entry.value)
+        # Process each habit
+        for habit in habits:
+            window_counts[habit.id] += (
+                completed_counts.get((habit.id, current_date), 0)
+                - completed_counts.get((habit.id, current_date - timedelta(days=7)), 0)
+            )
+            completion_rate = window_counts[habit.id] / 7.0
+            
+            raw_score, momentum_multiplier, final_habit_score = score_habit(
+                habit,
+                entry_values.get((habit.id, current_date)),
+                completion_rate,
+                momentum.get(habit.id, 1.0)
+            )
+            momentum[habit.id] = momentum_multiplier
+            
+            habit_score = {
+                "habit_id": habit.id,
+                "date": current_date,
+                "raw_score": raw_score,
+                "momentum_multiplier": momentum_multiplier,
+                "final_score": final_habit_score,
+                "weekly_completion_rate": completion_rate,
+                "created_at": created_at
+            }
+            if not _row_matches(existing_scores.get((habit.id, current_date)), habit_score):
+                unchanged = False
+                habit_score_rows.append(habit_score)
+            
+            # Add to total score calculation
+            total_weighted_score += final_habit_score * habit.weight
+            total_weight += habit.weight
         
-        # Calculate momentum multiplier
-        momentum_multiplier = calculate_momentum(session, habit, target_date)
+        # Calculate base daily score
+        base_score = total_weighted_score / total_weight if total_weight > 0 else 0.0
         
-        # Calculate final habit score
-        final_habit_score = raw_score * momentum_multiplier
+        # Apply WHOOP multiplier
+        whoop_multiplier = whoop_multipliers.get(current_date, 1.0)
+        final_score = base_score * whoop_multiplier
         
-        # Store habit score
-        habit_score = HabitScore(
-            habit_id=habit.id,
-            date=target_date,
-            raw_score=raw_score,
-            momentum_multiplier=momentum_multiplier,
-            final_score=final_habit_score,
-            weekly_completion_rate=get_weekly_completion_rate(session, habit.id, target_date)
-        )
+        # Calculate cumulative score
+        cumulative_score += final_score
+        
+        daily_score = {
+            "date": current_date,
+            "base_score": base_score,
+            "whoop_multiplier": whoop_multiplier,
+            "final_score": final_score,
+            "cumulative_score": cumulative_score,
+            "created_at": created_at
+        }
+        if not _row_matches(daily_by_date.get(current_date), daily_score):
+            unchanged = False
+            daily_rows.append(daily_score)
+        
+        recalculated.append((current_date, final_score))
         
-        # Check if habit score already exists
-        existing_statement = select(HabitScore).where(
-            HabitScore.habit_id == habit.id,
-            HabitScore.date == target_date
+        # Later days only depend on state that now matches what is stored
+        if converge_after is not None and unchanged and current_date >= converge_after:
+            break
+        
+        current_date += timedelta(days=1)
+    
+    upsert_score_rows(session, HabitScore, habit_score_rows)
+    upsert_score_rows(session, DailyScore, daily_rows)
+    
+    written_dates = [row["date"] for row in habit_score_rows + daily_rows]
+    if written_dates:
+        commit_score_writes(
+            session,
+            min(written_dates),
+            max(written_dates),
+            {row["habit_id"] for row in habit_score_rows}
         )
-        existing = session.exec(existing_statement).first()
+    else:
+        session.commit()
+    return recalculated
+
+
+def recalculate_score_range(session: Session, start_date: date, end_date: date) -> List[date]:
+    """
+    Rebuild habit and daily scores for every date in a range.
+    Entries are streamed once ordered by (habit, date) while a sliding 7-day
+    completion window and running momentum are kept per habit, and results
+    are written with one bulk upsert per chunk. Returns the recalculated dates.
+    """
+    if end_date < start_date:
+        return []
+    
+    previous_date = start_date - timedelta(days=1)
+    window_start = start_date - timedelta(days=6)
+    days = (end_date - start_date).days + 1
+    created_at = datetime.utcnow()
+    
+    habits_statement = select(Habit).where(Habit.is_active == True).order_by(Habit.id)
+    habits = session.exec(habits_statement).all()
+    habit_ids = [habit.id for habit in habits]
+    
+    # Momentum on the day before the range and the sum of every earlier final score
+    previous_momentum = load_momentum(session, habits, previous_date)
+    cumulative_score = cumulative_index.cumulative(session, previous_date)
+    
+    entries_statement = (
+        select(HabitEntry.habit_id, HabitEntry.date, HabitEntry.value)
+        .where(
+            HabitEntry.habit_id.in_(habit_ids),
+            HabitEntry.date >= window_start,
+            HabitEntry.date <= end_date
+        )
+        .order_by(HabitEntry.habit_id, HabitEntry.date)
+        .execution_options(yield_per=RECALCULATE_CHUNK_SIZE)
+    )
+    entry_groups = groupby(session.execute(entries_statement), key=lambda row: row.habit_id)
+    group = next(entry_groups, None)
+    
+    weighted_scores = [0.0] * days
+    total_weight = 0.0
+    habit_score_rows: List[Dict[str, Any]] = []
+    
+    for habit in habits:
+        rows: Iterator = iter(())
+        if group is not None and group[0] == habit.id:
+            rows = group[1]
         
-        if existing:
-            existing.raw_score = raw_score
-            existing.momentum_multiplier = momentum_multiplier
-            existing.final_score = final_habit_score
-            existing.weekly_completion_rate = habit_score.weekly_completion_rate
-        else:
-            session.add(habit_score)
+        for offset, (raw_score, momentum_multiplier, final_habit_score, completion_rate) in enumerate(
+            _stream_habit_scores(habit, rows, start_date, end_date, previous_momentum.get(habit.id, 1.0))
+        ):
+            habit_score_rows.append({
+                "habit_id": habit.id,
+                "date": start_date + timedelta(days=offset),
+                "raw_score": raw_score,
+                "momentum_multiplier": momentum_multiplier,
+                "final_score": final_habit_score,
+                "weekly_completion_rate": completion_rate,
+                "created_at": created_at
+            })
+            weighted_scores[offset] += final_habit_score * habit.weight
+            
+            if len(habit_score_rows) >= RECALCULATE_CHUNK_SIZE:
+                upsert_score_rows(session, HabitScore, habit_score_rows)
+                habit_score_rows = []
         
-        # Add to total score calculation
-        total_weighted_score += final_habit_score * habit.weight
         total_weight += habit.weight
+        
+        # The group iterator is exhausted once the habit has been walked
+        if group is not None and group[0] == habit.id:
+            group = next(entry_groups, None)
     
-    # Calculate base daily score
-    base_score = total_weighted_score / total_weight if total_weight > 0 else 0.0
-    
-    # Apply WHOOP multiplier
-    whoop_multiplier = calculate_whoop_multiplier(session, target_date)
-    final_score = base_score * whoop_multiplier
-    
-    # Calculate cumulative score
-    previous_date = target_date - timedelta(days=1)
-    previous_daily_statement = select(DailyScore).where(DailyScore.date == previous_date)
-    previous_daily = session.exec(previous_daily_statement).first()
-    previous_cumulative = previous_daily.cumulative_score if previous_daily else 0.0
-    cumulative_score = previous_cumulative + final_score
-    
-    # Store daily score
-    daily_score = DailyScore(
-        date=target_date,
-        base_score=base_score,
-        whoop_multiplier=whoop_multiplier,
-        final_score=final_score,
-        cumulative_score=cumulative_score
-    )
+    upsert_score_rows(session, HabitScore, habit_score_rows)
     
-    # Check if daily score already exists
-    existing_daily_statement = select(DailyScore).where(DailyScore.date == target_date)
-    existing_daily = session.exec(existing_daily_statement).first()
+    whoop_multipliers = load_whoop_multipliers(session, start_date, end_date)
     
-    if existing_daily:
-        existing_daily.base_score = base_score
-        existing_daily.whoop_multiplier = whoop_multiplier
-        existing_daily.final_score = final_score
-        existing_daily.cumulative_score = cumulative_score
-    else:
-        session.add(daily_score)
+    recalculated_dates = []
+    daily_rows: List[Dict[str, Any]] = []
     
+    for offset in range(days):
+        current_date = start_date + timedelta(days=offset)
+        base_score = weighted_scores[offset] / total_weight if total_weight > 0 else 0.0
+        whoop_multiplier = whoop_multipliers.get(current_date, 1.0)
+        final_score = base_score * whoop_multiplier
+        cumulative_score += final_score
+        
+        daily_rows.append({
+            "date": current_date,
+            "base_score": base_score,
+            "whoop_multiplier": whoop_multiplier,
+            "final_score": final_score,
+            "cumulative_score": cumulative_score,
+            "created_at": created_at
+        })
+        recalculated_dates.append(current_date)
+        
+        if len(daily_rows) >= RECALCULATE_CHUNK_SIZE:
+            upsert_score_rows(session, DailyScore, daily_rows)
+            daily_rows = []
+    
+    upsert_score_rows(session, DailyScore, daily_rows)
+    
+    commit_score_writes(session, start_date, end_date, habit_ids)
+    return recalculated_dates
+
+
+def _stream_habit_scores(
+    habit: Habit,
+    rows: Iterator,
+    start_date: date,
+    end_date: date,
+    momentum: float
+) -> Iterator[Tuple[float, float, float, float]]:
+    """
+    Walk one habit's date-ordered entry rows day by day, yielding
+    (raw_score, momentum_multiplier, final_score, completion_rate)
+    for each date from start_date through end_date.
+    """
+    window = deque(maxlen=7)
+    row = next(rows, None)
+    current_date = start_date - timedelta(days=6)
+    
+    while current_date <= end_date:
+        value = None
+        completed = 0
+        while row is not None and row.date == current_date:
+            if value is None:
+                value = row.value
+            if row.value > 0:
+                completed += 1
+            row = next(rows, None)
+        window.append(completed)
+        
+        if current_date >= start_date:
+            completion_rate = sum(window) / 7.0
+            raw_score, momentum, final_habit_score = score_habit(
+                habit, value, completion_rate, momentum
+            )
+            yield raw_score, momentum, final_habit_score, completion_rate
+        
+        current_date += timedelta(days=1)
+
+
+def upsert_score_rows(session: Session, model, rows: List[Dict[str, Any]]) -> None:
+    """
+    Write a chunk of HabitScore or DailyScore rows with a single
+    INSERT ... ON CONFLICT statement on the (habit_id, date) or (date) key.
+    """
+    if not rows:
+        return
+    
+    key_columns = ["habit_id", "date"] if model is HabitScore else ["date"]
+    update_columns = [column for column in rows[0] if column not in key_columns and column != "created_at"]
+    
+    session.execute(insert_on_conflict(session, model, key_columns, update_columns), rows)
+
+
+def commit_score_writes(session: Session, start_date: date, end_date: date, habit_ids: Iterable[int] = ()):
+    """
+    Commit score rows written for start_date through end_date (for habit_ids),
+    updating the aggregates derived from them and invalidating cached summaries.
+    """
+    refresh_aggregates(session, start_date, end_date, habit_ids)
+    score_version = bump_score_version(session)
     session.commit()
-    return final_score
\ No newline at end of file
+    cumulative_index.refresh(session, start_date, end_date, score_version)
+    summary_cache.clear()
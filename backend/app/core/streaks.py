@@ -0,0 +1,143 @@
+from datetime import date, timedelta
+from itertools import groupby
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlmodel import Session, select, delete, func
+from ..models import DailyScore, HabitScore, ScoreStreak
+
+
+def find_streak_runs(scores: Iterable[Tuple[date, float]], habit_id: Optional[int] = None) -> List[ScoreStreak]:
+    """
+    Split date-ordered (date, score) pairs into runs of consecutive
+    days with a positive score.
+    """
+    runs = []
+    current = None
+    
+    for score_date, score in scores:
+        if score <= 0:
+            current = None
+            continue
+        
+        if current and current.end_date == score_date - timedelta(days=1):
+            current.end_date = score_date
+            current.length += 1
+        else:
+            current = ScoreStreak(habit_id=habit_id, start_date=score_date, end_date=score_date, length=1)
+            runs.append(current)
+    
+    return runs
+
+
+def refresh_streaks(session: Session, start_date: date, end_date: date, habit_ids: Iterable[int] = ()):
+    """
+    Update stored streak runs after scores between start_date and end_date
+    were rewritten: the daily run set (positive final score) and the run set
+    of each habit in habit_ids (positive raw score). Only runs touching the
+    range are rescanned. Does not commit.
+    """
+    keys = {None, *habit_ids}
+    
+    # Runs overlapping or adjacent to the range may merge, split or shrink
+    touching_statement = select(ScoreStreak).where(
+        ScoreStreak.end_date >= start_date - timedelta(days=1),
+        ScoreStreak.start_date <= end_date + timedelta(days=1)
+    )
+    scan_ranges: Dict[Optional[int], Tuple[date, date]] = {key: (start_date, end_date) for key in keys}
+    
+    for run in session.exec(touching_statement):
+        if run.habit_id not in keys:
+            continue
+        
+        scan_start, scan_end = scan_ranges[run.habit_id]
+        scan_ranges[run.habit_id] = (min(scan_start, run.start_date), max(scan_end, run.end_date))
+        session.delete(run)
+    
+    daily_start, daily_end = scan_ranges[None]
+    daily_statement = select(DailyScore.date, DailyScore.final_score).where(
+        DailyScore.date >= daily_start,
+        DailyScore.date <= daily_end
+    ).order_by(DailyScore.date)
+    session.add_all(find_streak_runs(session.exec(daily_statement)))
+    
+    habit_ranges = [scan_range for key, scan_range in scan_ranges.items() if key is not None]
+    if not habit_ranges:
+        return
+    
+    # One query for every habit, trimmed to each habit's own scan range
+    habit_statement = select(HabitScore.habit_id, HabitScore.date, HabitScore.raw_score).where(
+        HabitScore.habit_id.in_(keys - {None}),
+        HabitScore.date >= min(scan_start for scan_start, _ in habit_ranges),
+        HabitScore.date <= max(scan_end for _, scan_end in habit_ranges)
+    ).order_by(HabitScore.habit_id, HabitScore.date)
+    
+    for habit_id, rows in groupby(session.exec(habit_statement), key=lambda row: row.habit_id):
+        scan_start, scan_end = scan_ranges[habit_id]
+        scores = ((row.date, row.raw_score) for row in rows if scan_start <= row.date <= scan_end)
+        session.add_all(find_streak_runs(scores, habit_id))
+
+
+def rebuild_streaks(session: Session):
+    """
+    Rebuild all daily and per-habit streak runs from the full score history.
+    Does not commit.
+    """
+    session.execute(delete(ScoreStreak))
+    
+    daily_statement = select(DailyScore.date, DailyScore.final_score).order_by(DailyScore.date)
+    session.add_all(find_streak_runs(session.exec(daily_statement)))
+    
+    habit_statement = select(HabitScore.habit_id, HabitScore.date, HabitScore.raw_score).order_by(
+        HabitScore.habit_id, HabitScore.date
+    )
+    for habit_id, rows in groupby(session.exec(habit_statement), key=lambda row: row.habit_id):
+        session.add_all(find_streak_runs(((row.date, row.raw_score) for row in rows), habit_id))
+
+
+def get_streaks(session: Session, current_date: date) -> Tuple[int, int]:
+    """
+    Get (current_streak, longest_streak) in days for the daily score. The current
+    streak is the run ending today or yesterday, so it holds until today is scored.
+    """
+    current_statement = select(ScoreStreak.length).where(
+        ScoreStreak.habit_id == None,
+        ScoreStreak.end_date >= current_date - timedelta(days=1),
+        ScoreStreak.start_date <= current_date
+    ).order_by(ScoreStreak.end_date.desc())
+    current_streak = session.exec(current_statement).first() or 0
+    
+    longest_statement = select(func.max(ScoreStreak.length)).where(
+        ScoreStreak.habit_id == None,
+        ScoreStreak.start_date <= current_date
+    )
+    longest_streak = session.exec(longest_statement).first() or 0
+    
+    return current_streak, longest_streak
+
+
+def get_habit_streak(session: Session, habit_id: int, current_date: date) -> int:
+    """
+    Get the current streak in days of a habit scoring above zero, counting
+    the run ending today or yesterday.
+    """
+    statement = select(ScoreStreak.length).where(
+        ScoreStreak.habit_id == habit_id,
+        ScoreStreak.end_date >= current_date - timedelta(days=1),
+        ScoreStreak.start_date <= current_date
+    ).order_by(ScoreStreak.end_date.desc())
+    
+    return session.exec(statement).first() or 0
+
+
+def get_habit_streaks(session: Session, habit_ids: Iterable[int], current_date: date) -> Dict[int, int]:
+    """
+    Get the current streak of several habits in one query, keyed by habit id.
+    Habits without a current streak are omitted.
+    """
+    statement = select(ScoreStreak.habit_id, ScoreStreak.length).where(
+        ScoreStreak.habit_id.in_(list(habit_ids)),
+        ScoreStreak.end_date >= current_date - timedelta(days=1),
+        ScoreStreak.start_date <= current_date
+    ).order_by(ScoreStreak.end_date)
+    
+    # Ordered by end date so the latest run of each habit wins
+    return {habit_id: length for habit_id, length in session.exec(statement)}
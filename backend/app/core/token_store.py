@@ -0,0 +1,103 @@
+import base64
+import hashlib
+import json
+from datetime import datetime
+from typing import Any, Dict, Optional
+from cryptography.fernet import Fernet, InvalidToken
+from sqlmodel import Session, select, delete
+from ..config import DEFAULT_SECRET_KEY, settings
+from ..database import engine, insert_on_conflict
+from ..models import OAuthToken
+from .cache import TTLCache
+
+
+def fernet_from_secret(secret_key: str) -> Fernet:
+    """Derive a Fernet key from the application secret key."""
+    return Fernet(base64.urlsafe_b64encode(hashlib.sha256(secret_key.encode()).digest()))
+
+
+class TokenStore:
+    """
+    Dict-like store for one provider's OAuth tokens. Tokens are encrypted with
+    settings.secret_key in the database, so every worker process and the
+    scheduler share them, and reads go through a short in-process cache.
+    """
+    
+    def __init__(self, provider: str, ttl_seconds: float):
+        self.provider = provider
+        self._fernet = fernet_from_secret(settings.secret_key)
+        self._cache = TTLCache(ttl_seconds)
+    
+    def _load(self) -> Dict[str, Any]:
+        tokens = self._cache.get(self.provider)
+        if tokens is not None:
+            return tokens
+        
+        with Session(engine) as session:
+            statement = select(OAuthToken.encrypted_tokens).where(OAuthToken.provider == self.provider)
+            encrypted_tokens = session.exec(statement).first()
+        
+        tokens = {}
+        if encrypted_tokens:
+            try:
+                tokens = json.loads(self._fernet.decrypt(encrypted_tokens.encode()))
+            except InvalidToken:
+                print(f"Stored {self.provider} tokens could not be decrypted with the current secret key")
+        
+        self._cache.set(self.provider, tokens)
+        return tokens
+    
+    def _save(self, tokens: Dict[str, Any]):
+        if settings.secret_key == DEFAULT_SECRET_KEY:
+            print(
+                f"Warning: storing {self.provider} tokens encrypted with the default SECRET_KEY, "
+                "which anyone can decrypt. Set SECRET_KEY to a private value."
+            )
+        
+        row = {
+            "provider": self.provider,
+            "encrypted_tokens": self._fernet.encrypt(json.dumps(tokens).encode()).decode(),
+            "updated_at": datetime.utcnow()
+        }
+        
+        with Session(engine) as session:
+            upsert_statement = insert_on_conflict(session, OAuthToken, ["provider"], ["encrypted_tokens", "updated_at"])
+            session.execute(upsert_statement, row)
+            session.commit()
+        
+        self._cache.set(self.provider, tokens)
+    
+    def reload(self):
+        """Drop the cached tokens so the next read sees changes from other processes."""
+        self._cache.clear()
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Copy of the current tokens. Reads the database on a cache miss, so
+        async code should call it through run_in_threadpool.
+        """
+        return dict(self._load())
+    
+    def get(self, key: str, default: Optional[Any] = None) -> Any:
+        return self._load().get(key, default)
+    
+    def __getitem__(self, key: str) -> Any:
+        return self._load()[key]
+    
+    def __contains__(self, key: str) -> bool:
+        return key in self._load()
+    
+    def __setitem__(self, key: str, value: Any):
+        self.update({key: value})
+    
+    def update(self, values: Optional[Dict[str, Any]] = None, **kwargs: Any):
+        """Merge values into the latest stored tokens and save them."""
+        self.reload()
+        self._save(dict(self._load(), **(values or {}), **kwargs))
+    
+    def clear(self):
+        with Session(engine) as session:
+            session.execute(delete(OAuthToken).where(OAuthToken.provider == self.provider))
+            session.commit()
+        
+        self._cache.set(self.provider, {})
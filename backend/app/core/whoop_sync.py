@@ -0,0 +1,272 @@
+import asyncio
+from fastapi.concurrency import run_in_threadpool
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlmodel import Session, select
+from ..config import settings
+from ..database import insert_on_conflict, run_in_session
+from ..models import WhoopData, WhoopSyncState
+from ..utils.whoop_cache import WhoopResponseCache
+from ..utils.whoop_client import WhoopClient
+from .recompute_queue import score_recompute_queue
+from .scoring import calculate_whoop_multiplier_from_scores
+
+# Parsed WHOOP records written to the database per statement while streaming
+WHOOP_SYNC_CHUNK_SIZE = 500
+
+# WhoopData columns written by a sync, keyed by date
+WHOOP_ROW_FIELDS = [
+    "date",
+    "sleep_score",
+    "hrv_score",
+    "recovery_score",
+    "whoop_multiplier",
+    "recovery_updated_at",
+    "sleep_updated_at"
+]
+
+
+def parse_timestamp(value: str) -> datetime:
+    """Parse a v2 API ISO timestamp such as 2024-01-01T06:30:00.000Z."""
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def parse_updated_at(record: Dict) -> Optional[datetime]:
+    """Parse a record's updated_at as a naive UTC datetime, as stored in the database."""
+    if not record.get("updated_at"):
+        return None
+    
+    return parse_timestamp(record["updated_at"]).astimezone(timezone.utc).replace(tzinfo=None)
+
+
+# Main sleep of each date while indexing: (rank, sleep) keyed by start date
+SleepCandidates = Dict[date, Tuple[Tuple[bool, timedelta], Dict]]
+
+
+def add_sleep_record(candidates: SleepCandidates, sleep_record: Dict):
+    """
+    Fold one sleep record into the candidates if it is the main sleep of
+    its date so far: the longest one that isn't a nap.
+    """
+    # v2 API: use start timestamp for sleep records
+    if not sleep_record.get("start"):
+        return
+    
+    start = parse_timestamp(sleep_record["start"])
+    end = parse_timestamp(sleep_record["end"]) if sleep_record.get("end") else start
+    rank = (not sleep_record.get("nap", False), end - start)
+    
+    sleep_date = start.date()
+    if sleep_date not in candidates or rank > candidates[sleep_date][0]:
+        candidates[sleep_date] = (rank, {
+            # Use sleep_performance_percentage as the sleep score (0-100%)
+            "sleep_score": (sleep_record.get("score") or {}).get("sleep_performance_percentage"),
+            "sleep_updated_at": parse_updated_at(sleep_record)
+        })
+
+
+def sleep_index_from(candidates: SleepCandidates) -> Dict[date, Dict]:
+    return {sleep_date: sleep for sleep_date, (rank, sleep) in candidates.items()}
+
+
+def index_sleep_records(sleep_records: Iterable[Dict]) -> Dict[date, Dict]:
+    """
+    Index sleep scores and update times by the date each sleep started,
+    keeping the main sleep of each date.
+    """
+    candidates: SleepCandidates = {}
+    for sleep_record in sleep_records:
+        add_sleep_record(candidates, sleep_record)
+    
+    return sleep_index_from(candidates)
+
+
+async def load_sleep_index(client: WhoopClient, start_date: date, end_date: date) -> Dict[date, Dict]:
+    """
+    Page through sleep records for a date range and index the main sleep
+    score by date. Records are folded in as they arrive, so only the main
+    sleep of each date is held.
+    """
+    candidates: SleepCandidates = {}
+    async for sleep_record in client.iter_sleep_records(start_date, end_date):
+        add_sleep_record(candidates, sleep_record)
+    
+    return sleep_index_from(candidates)
+
+
+def parse_recovery_record(record: Dict, sleep_index: Dict[date, Dict]) -> Optional[Dict]:
+    """
+    Parse one recovery record into a WhoopData row joined with the sleep
+    score of the same date, or None for records without a date.
+    """
+    # v2 API: use created_at as the date reference
+    if not record.get("created_at"):
+        return None
+    
+    record_date = parse_timestamp(record["created_at"]).date()
+    
+    # Extract scores from v2 API structure
+    score = record.get("score") or {}
+    recovery_score = score.get("recovery_score")
+    hrv_score = score.get("hrv_rmssd_milli")
+    sleep = sleep_index.get(record_date, {})
+    sleep_score = sleep.get("sleep_score")
+    
+    return {
+        "date": record_date,
+        "sleep_score": sleep_score,
+        "hrv_score": hrv_score,
+        "recovery_score": recovery_score,
+        "whoop_multiplier": calculate_whoop_multiplier_from_scores(sleep_score, hrv_score, recovery_score),
+        "recovery_updated_at": parse_updated_at(record),
+        "sleep_updated_at": sleep.get("sleep_updated_at")
+    }
+
+
+def write_whoop_rows(session: Session, rows: List[Dict]) -> List[date]:
+    """
+    Upsert one chunk of parsed WHOOP rows keyed by date in a single statement
+    and commit. Rows identical to the stored record, including the WHOOP
+    update times, are skipped. Returns the dates written.
+    """
+    # Later records for the same date win
+    rows_by_date = {row["date"]: row for row in rows}
+    if not rows_by_date:
+        return []
+    
+    stored_statement = select(*[getattr(WhoopData, field) for field in WHOOP_ROW_FIELDS]).where(
+        WhoopData.date.in_(rows_by_date)
+    )
+    stored = {tuple(values) for values in session.exec(stored_statement)}
+    
+    created_at = datetime.utcnow()
+    changed_rows = [
+        dict(row, created_at=created_at) for row in rows_by_date.values()
+        if tuple(row[field] for field in WHOOP_ROW_FIELDS) not in stored
+    ]
+    
+    if changed_rows:
+        upsert_statement = insert_on_conflict(session, WhoopData, ["date"], WHOOP_ROW_FIELDS[1:])
+        session.execute(upsert_statement, changed_rows)
+        session.commit()
+    
+    return [row["date"] for row in changed_rows]
+
+
+def get_sync_state(session: Session) -> WhoopSyncState:
+    """Get the WHOOP sync state row, creating it on first use."""
+    state = session.exec(select(WhoopSyncState)).first()
+    
+    if not state:
+        state = WhoopSyncState()
+        session.add(state)
+    
+    return state
+
+
+def save_sync_cursor(session: Session, cursor: Optional[datetime]):
+    """Record a completed sync, moving the cursor forward to cursor."""
+    state = get_sync_state(session)
+    if cursor and (state.cursor is None or cursor > state.cursor):
+        state.cursor = cursor
+    state.last_synced_at = datetime.utcnow()
+    session.add(state)
+    session.commit()
+
+
+def get_sync_start_date(session: Session, start_date: date) -> date:
+    """
+    Move the start of a sync window up to the stored cursor, less a few
+    days of overlap for records WHOOP still rescores after the fact.
+    """
+    cursor = get_sync_state(session).cursor
+    
+    if cursor is None:
+        return start_date
+    
+    return max(start_date, cursor.date() - timedelta(days=settings.whoop_sync_overlap_days))
+
+
+async def sync_whoop_range(client: WhoopClient, start_date: date, end_date: date) -> List[date]:
+    """
+    Stream WHOOP recovery records for a date range, join each with the main
+    sleep of its date and write changed rows in chunks, then advance the
+    sync cursor. A score recompute from the earliest changed date is queued
+    for every chunk written, even when a later page fails.
+    Each write runs in the threadpool with its own session. Returns the
+    dates written.
+    """
+    # Page through sleep while recovery pages stream in; HRV comes with the recovery records
+    sleep_task = asyncio.create_task(load_sleep_index(client, start_date, end_date))
+    sleep_index = None
+    
+    synced_dates = []
+    chunk = []
+    cursor = None
+    
+    try:
+        async for record in client.iter_recovery_records(start_date, end_date):
+            if sleep_index is None:
+                sleep_index = await sleep_task
+            
+            row = parse_recovery_record(record, sleep_index)
+            if row is None:
+                continue  # Skip records without date
+            
+            record_start = parse_timestamp(record["created_at"]).astimezone(timezone.utc).replace(tzinfo=None)
+            cursor = max(cursor, record_start) if cursor else record_start
+            
+            chunk.append(row)
+            
+            if len(chunk) >= WHOOP_SYNC_CHUNK_SIZE:
+                synced_dates.extend(await run_in_threadpool(run_in_session, write_whoop_rows, chunk))
+                chunk = []
+        
+        synced_dates.extend(await run_in_threadpool(run_in_session, write_whoop_rows, chunk))
+        
+        # Only a completed sync moves the cursor
+        await run_in_threadpool(run_in_session, save_sync_cursor, cursor)
+    finally:
+        sleep_task.cancel()
+        
+        # WHOOP multipliers feed every final and cumulative score from the earliest
+        # change on; chunks are committed as they go, so queue them even if the sync failed
+        if synced_dates:
+            await score_recompute_queue.submit(min(synced_dates), changed_through=max(synced_dates), wait=False)
+    
+    return synced_dates
+
+
+def latest_records(records) -> List[Dict]:
+    """
+    Keep the last copy of each WHOOP record, identified by its id, cycle_id
+    or start time.
+    """
+    latest = {}
+    
+    for record in records:
+        key = record.get("id") or record.get("cycle_id") or record.get("created_at") or record.get("start")
+        latest[key] = record
+    
+    return list(latest.values())
+
+
+def reprocess_cached_whoop(session: Session, cache: WhoopResponseCache) -> List[date]:
+    """
+    Rebuild WhoopData from every cached WHOOP response without calling the
+    API, re-applying the current parsing and multiplier formula.
+    Returns the dates written.
+    """
+    sleep_index = index_sleep_records(latest_records(cache.iter_records(WhoopClient.SLEEP_PATH)))
+    
+    rows = []
+    for record in latest_records(cache.iter_records(WhoopClient.RECOVERY_PATH)):
+        row = parse_recovery_record(record, sleep_index)
+        if row is not None:
+            rows.append(row)
+    
+    written_dates = []
+    for chunk_start in range(0, len(rows), WHOOP_SYNC_CHUNK_SIZE):
+        written_dates.extend(write_whoop_rows(session, rows[chunk_start:chunk_start + WHOOP_SYNC_CHUNK_SIZE]))
+    
+    return written_dates
@@ -1,13 +1,54 @@
+from typing import Any, Callable, List
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlmodel import SQLModel, create_engine, Session
 from .config import settings
 
 engine = create_engine(settings.database_url, connect_args={"check_same_thread": False})
 
 
+@event.listens_for(engine, "connect")
+def configure_sqlite_connection(dbapi_connection, connection_record):
+    """
+    Use SQLite's write-ahead log so requests running in the threadpool can
+    read while another writes. Writers still wait on each other, up to the
+    sqlite3 module's 5 second busy timeout.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+    
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
 def create_db_and_tables():
     SQLModel.metadata.create_all(engine)
 
 
 def get_session():
     with Session(engine) as session:
-        yield session
\ No newline at end of file
+        yield session
+
+
+def run_in_session(func: Callable[..., Any], *args: Any) -> Any:
+    """
+    Call func(session, *args) with a session of its own. Pass it to
+    run_in_threadpool so a session never moves between threads.
+    """
+    with Session(engine) as session:
+        return func(session, *args)
+
+
+def insert_on_conflict(session: Session, model, index_elements: List[str], update_columns: List[str]):
+    """
+    Build an INSERT ... ON CONFLICT (index_elements) DO UPDATE statement for a
+    table model. Execute it with a list of row dicts to upsert them in bulk.
+    """
+    dialect_insert = postgresql.insert if session.get_bind().dialect.name == "postgresql" else sqlite.insert
+    statement = dialect_insert(model.__table__)
+    return statement.on_conflict_do_update(
+        index_elements=index_elements,
+        set_={column: statement.excluded[column] for column in update_columns}
+    )
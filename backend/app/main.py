@@ -5,6 +5,13 @@ from fastapi.middleware.cors import CORSMiddleware
 import json
 from pathlib import Path
 from .database import create_db_and_tables, get_session
+from .core.recompute_queue import score_recompute_queue
+from .core.aggregates import ensure_aggregates
+from .core.score_index import cumulative_index
+from .core.completions import ensure_completions
+from .core.scheduler import job_scheduler
+from .core.notifications import sync_whoop_data, send_daily_reminder
+from .utils.whoop_client import get_http_client, close_http_client
 from .models import Habit
 from .api import habits, scores, auth, whoop, notifications
 from .config import settings
@@ -37,9 +44,27 @@ if static_path.exists():
 
 @app.on_event("startup")
 async def startup_event():
-    """Initialize database and load default habits."""
+    """Initialize database, load default habits and start background workers."""
     create_db_and_tables()
     await load_default_habits()
+    with next(get_session()) as session:
+        ensure_aggregates(session)
+        ensure_completions(session)
+        cumulative_index.rebuild(session)
+    score_recompute_queue.start()
+    get_http_client()
+    
+    if settings.scheduler_enabled:
+        job_scheduler.add_job("whoop_sync", settings.whoop_sync_time, sync_whoop_data)
+        job_scheduler.add_job("daily_reminder", settings.daily_reminder_time, send_daily_reminder)
+        job_scheduler.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Finish running jobs and queued score recomputes, then close pooled connections."""
+    await job_scheduler.stop()
+    await score_recompute_queue.stop()
+    await close_http_client()
 
 @app.get("/")
 async def serve_frontend():
@@ -1,5 +1,8 @@
-from .habit import Habit, HabitEntry, HabitScore
-from .score import DailyScore
-from .whoop import WhoopData
+from .habit import Habit, HabitEntry, HabitScore, HabitCompletion
+from .score import DailyScore, WeeklyScore, ScoreVersion
+from .whoop import WhoopData, WhoopSyncState
+from .streak import ScoreStreak
+from .token import OAuthToken
+from .job import ScheduledJob
 
-__all__ = ["Habit", "HabitEntry", "HabitScore", "DailyScore", "WhoopData"]
\ No newline at end of file
+__all__ = ["Habit", "HabitEntry", "HabitScore", "HabitCompletion", "DailyScore", "WeeklyScore", "ScoreVersion", "WhoopData", "WhoopSyncState", "ScoreStreak", "OAuthToken", "ScheduledJob"]
\ No newline at end of file
@@ -1,5 +1,6 @@
+from sqlalchemy import Index
 from sqlmodel import SQLModel, Field
-from datetime import date, datetime
+from datetime import date as Date, datetime
 from typing import Optional
 
 
@@ -28,28 +29,45 @@ class Habit(SQLModel, table=True):
 
 class HabitEntry(SQLModel, table=True):
     __tablename__ = "habit_entries"
+    __table_args__ = (
+        Index("ix_habit_entries_habit_id_date", "habit_id", "date", unique=True),
+    )
     
     id: Optional[int] = Field(primary_key=True)
     habit_id: int = Field(foreign_key="habits.id")
-    date: date
+    date: Date = Field(index=True)
     value: float
     created_at: datetime = Field(default_factory=datetime.utcnow)
-    
-    class Config:
-        unique_together = [["habit_id", "date"]]
 
 
 class HabitScore(SQLModel, table=True):
     __tablename__ = "habit_scores"
+    __table_args__ = (
+        Index("ix_habit_scores_habit_id_date", "habit_id", "date", unique=True),
+    )
     
     id: Optional[int] = Field(primary_key=True)
     habit_id: int = Field(foreign_key="habits.id")
-    date: date
+    date: Date = Field(index=True)
     raw_score: float
     momentum_multiplier: float
     final_score: float
     weekly_completion_rate: Optional[float] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class HabitCompletion(SQLModel, table=True):
+    """
+    Days of one year a habit was completed (value > 0), one bit per day
+    with bit 0 for January 1st.
+    """
+    __tablename__ = "habit_completions"
+    __table_args__ = (
+        Index("ix_habit_completions_habit_id_year", "habit_id", "year", unique=True),
+    )
     
-    class Config:
-        unique_together = [["habit_id", "date"]]
\ No newline at end of file
+    id: Optional[int] = Field(primary_key=True)
+    habit_id: int = Field(foreign_key="habits.id")
+    year: int
+    bits: bytes
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
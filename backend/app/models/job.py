@@ -0,0 +1,21 @@
+from sqlmodel import SQLModel, Field
+from datetime import datetime
+from typing import Optional
+
+
+class ScheduledJob(SQLModel, table=True):
+    """
+    Last run of one daily job run by the in-process scheduler. Times are
+    naive UTC; last_scheduled_for is the occurrence the last run covered.
+    """
+    __tablename__ = "scheduled_jobs"
+    
+    id: Optional[int] = Field(primary_key=True)
+    name: str = Field(unique=True)
+    run_time: str
+    last_scheduled_for: Optional[datetime] = None
+    last_started_at: Optional[datetime] = None
+    last_finished_at: Optional[datetime] = None
+    last_duration_seconds: Optional[float] = None
+    last_status: Optional[str] = None
+    last_error: Optional[str] = None
@@ -12,4 +12,25 @@ class DailyScore(SQLModel, table=True):
     whoop_multiplier: float = Field(default=1.0)
     final_score: float
     cumulative_score: float
-    created_at: datetime = Field(default_factory=datetime.utcnow)
\ No newline at end of file
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class WeeklyScore(SQLModel, table=True):
+    __tablename__ = "weekly_scores"
+    
+    id: Optional[int] = Field(primary_key=True)
+    week_start: Date = Field(unique=True)
+    total_score: float
+    scored_days: int
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+class ScoreVersion(SQLModel, table=True):
+    """
+    Single-row counter bumped in the same transaction as every score write,
+    so in-process indexes can tell cheaply whether scores changed.
+    """
+    __tablename__ = "score_versions"
+    
+    id: Optional[int] = Field(primary_key=True)
+    version: int = Field(default=0)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
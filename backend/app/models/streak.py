@@ -0,0 +1,17 @@
+from sqlmodel import SQLModel, Field
+from datetime import date as Date
+from typing import Optional
+
+
+class ScoreStreak(SQLModel, table=True):
+    """
+    A run of consecutive days with a positive score: the final daily score
+    when habit_id is None, otherwise that habit's raw score.
+    """
+    __tablename__ = "score_streaks"
+    
+    id: Optional[int] = Field(primary_key=True)
+    habit_id: Optional[int] = Field(default=None, foreign_key="habits.id", index=True)
+    start_date: Date = Field(index=True)
+    end_date: Date = Field(index=True)
+    length: int = Field(index=True)
@@ -0,0 +1,15 @@
+from sqlmodel import SQLModel, Field
+from datetime import datetime
+from typing import Optional
+
+
+class OAuthToken(SQLModel, table=True):
+    """
+    OAuth tokens of one provider, stored as a Fernet-encrypted JSON object.
+    """
+    __tablename__ = "oauth_tokens"
+    
+    id: Optional[int] = Field(primary_key=True)
+    provider: str = Field(unique=True)
+    encrypted_tokens: str
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
@@ -12,4 +12,18 @@ class WhoopData(SQLModel, table=True):
     hrv_score: Optional[float] = None
     recovery_score: Optional[float] = None
     whoop_multiplier: Optional[float] = None
-    created_at: datetime = Field(default_factory=datetime.utcnow)
\ No newline at end of file
+    recovery_updated_at: Optional[datetime] = None
+    sleep_updated_at: Optional[datetime] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class WhoopSyncState(SQLModel, table=True):
+    """
+    Cursor of the last successful WHOOP sync: the start time of the latest
+    recovery record written, where the next sync resumes.
+    """
+    __tablename__ = "whoop_sync_state"
+    
+    id: Optional[int] = Field(primary_key=True)
+    cursor: Optional[datetime] = None
+    last_synced_at: Optional[datetime] = None
\ No newline at end of file
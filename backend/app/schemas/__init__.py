@@ -1,8 +1,8 @@
-from .habit import HabitCreate, HabitUpdate, HabitResponse, HabitEntryCreate, HabitEntryResponse
-from .score import DailyScoreResponse, HabitScoreResponse
+from .habit import HabitCreate, HabitUpdate, HabitResponse, HabitEntryCreate, HabitEntryResponse, HabitEntrySubmitResponse
+from .score import DailyScoreResponse, HabitScoreResponse, WeeklyScoreResponse
 
 __all__ = [
     "HabitCreate", "HabitUpdate", "HabitResponse", 
-    "HabitEntryCreate", "HabitEntryResponse",
-    "DailyScoreResponse", "HabitScoreResponse"
+    "HabitEntryCreate", "HabitEntryResponse", "HabitEntrySubmitResponse",
+    "DailyScoreResponse", "HabitScoreResponse", "WeeklyScoreResponse"
 ]
\ No newline at end of file
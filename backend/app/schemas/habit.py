@@ -62,4 +62,8 @@ class HabitEntryResponse(BaseModel):
     habit_id: int
     date: date
     value: float
-    created_at: datetime
\ No newline at end of file
+    created_at: datetime
+
+
+class HabitEntrySubmitResponse(HabitEntryResponse):
+    scores_pending: bool = False
\ No newline at end of file
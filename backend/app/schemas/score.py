@@ -21,4 +21,11 @@ class HabitScoreResponse(BaseModel):
     momentum_multiplier: float
     final_score: float
     weekly_completion_rate: Optional[float]
-    created_at: datetime
\ No newline at end of file
+    created_at: datetime
+
+
+class WeeklyScoreResponse(BaseModel):
+    week_start: date
+    total_score: float
+    scored_days: int
+    average_score: float
\ No newline at end of file
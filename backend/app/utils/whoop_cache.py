@@ -0,0 +1,107 @@
+import gzip
+import hashlib
+import json
+import os
+import time
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+
+class WhoopResponseCache:
+    """
+    On-disk cache of raw WHOOP API responses, one gzip-compressed JSON file
+    per request named by a hash of the endpoint and its parameters.
+    """
+    
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+    
+    def _path(self, path: str, params: Dict[str, Any]) -> Path:
+        key = json.dumps([path, sorted((name, str(value)) for name, value in params.items())])
+        return self.directory / f"{hashlib.sha256(key.encode()).hexdigest()}.json.gz"
+    
+    def get(self, path: str, params: Dict[str, Any], max_age: Optional[float]) -> Optional[Dict[str, Any]]:
+        """
+        Get a cached response body, or None when missing or older than
+        max_age seconds. A max_age of None accepts any age.
+        """
+        cache_path = self._path(path, params)
+        
+        try:
+            with gzip.open(cache_path, "rt") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        
+        if max_age is not None and time.time() - entry["fetched_at"] > max_age:
+            return None
+        
+        return entry["body"]
+    
+    def set(self, path: str, params: Dict[str, Any], body: Dict[str, Any]):
+        """Store a response body, replacing any earlier copy."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        cache_path = self._path(path, params)
+        
+        entry = {
+            "path": path,
+            "params": {name: str(value) for name, value in params.items()},
+            "fetched_at": time.time(),
+            "body": body
+        }
+        
+        # Write beside the final file and rename so readers never see a partial file
+        temp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+        with gzip.open(temp_path, "wt") as f:
+            json.dump(entry, f)
+        os.replace(temp_path, cache_path)
+    
+    def purge(self, max_age: float) -> int:
+        """Delete cached responses fetched more than max_age seconds ago. Returns the number deleted."""
+        cutoff = time.time() - max_age
+        deleted = 0
+        
+        for cache_path in self.directory.glob("*.json.gz"):
+            try:
+                # Files are written once and renamed into place, so mtime is the fetch time
+                if cache_path.stat().st_mtime < cutoff:
+                    cache_path.unlink()
+                    deleted += 1
+            except OSError:
+                continue
+        
+        return deleted
+    
+    def iter_records(self, path: str) -> Iterator[Dict[str, Any]]:
+        """
+        Yield the records of every cached response for an endpoint, oldest
+        fetch first, so later copies of a record come after earlier ones.
+        """
+        entries = []
+        
+        for cache_path in self.directory.glob("*.json.gz"):
+            try:
+                with gzip.open(cache_path, "rt") as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                continue
+            
+            if entry["path"] == path:
+                entries.append(entry)
+        
+        for entry in sorted(entries, key=lambda entry: entry["fetched_at"]):
+            yield from entry["body"].get("records", [])
+
+
+def window_is_closed(params: Dict[str, Any], open_days: int) -> bool:
+    """
+    Whether a request's date window ended more than open_days ago, after
+    which WHOOP no longer rescores its records. Windows that end today or
+    within open_days are never closed.
+    """
+    end = params.get("end")
+    if not end:
+        return False
+    
+    return (date.today() - date.fromisoformat(str(end)[:10])).days > open_days
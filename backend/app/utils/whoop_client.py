@@ -1,44 +1,257 @@
+import asyncio
+import random
+import time
 import httpx
-from datetime import date, timedelta
-from typing import Optional, Dict, Any
+from fastapi.concurrency import run_in_threadpool
+from datetime import date, datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, Optional, Dict, Any
 from ..config import settings
+from .whoop_cache import WhoopResponseCache, window_is_closed
+
+# Connection pool shared by every WHOOP request so keep-alive connections are reused
+HTTP_LIMITS = httpx.Limits(max_connections=10, max_keepalive_connections=5, keepalive_expiry=60.0)
+HTTP_TIMEOUT = httpx.Timeout(30.0, connect=10.0)
+
+# Responses worth retrying after a pause
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+_http_client: Optional[httpx.AsyncClient] = None
+
+# Raw responses kept on disk; an empty whoop_cache_dir disables caching
+response_cache = WhoopResponseCache(settings.whoop_cache_dir) if settings.whoop_cache_dir else None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get the shared HTTP client, opening it on first use."""
+    global _http_client
+    
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+    
+    return _http_client
+
+
+async def close_http_client():
+    """Close the shared HTTP client and its pooled connections."""
+    global _http_client
+    
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+class TokenBucket:
+    """
+    Client-side rate limiter: allows bursts of up to capacity requests and
+    refills at rate requests per second.
+    """
+    
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+    
+    async def acquire(self):
+        """Wait until a request may be sent."""
+        while True:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+rate_limiter = TokenBucket(settings.whoop_requests_per_minute / 60.0, max(settings.whoop_requests_per_minute / 10.0, 1.0))
+
+# Serializes token refreshes so concurrent 401s rotate the refresh token once
+_refresh_lock = asyncio.Lock()
+
+
+def retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    """Read a Retry-After header given in seconds or as an HTTP date."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    
+    try:
+        return max((parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_seconds(attempt: int) -> float:
+    """Exponential backoff with full jitter, capped at whoop_backoff_max_seconds."""
+    return random.uniform(0, min(settings.whoop_backoff_max_seconds, settings.whoop_backoff_seconds * 2 ** attempt))
 
 
 class WhoopClient:
-    """WHOOP API client for fetching biometric data."""
+    """
+    WHOOP API client for fetching biometric data. Requests are rate limited,
+    retried with backoff on 429, 5xx and network errors, and retried once
+    with a refreshed access token on 401 when tokens holds a refresh_token.
+    """
     
-    BASE_URL = "https://api.prod.whoop.com/developer"
+    BASE_URL = f"{settings.whoop_api_base_url}/developer"
+    RECOVERY_PATH = "/v2/recovery"
+    SLEEP_PATH = "/v2/activity/sleep"
+    PAGE_SIZE = 25
     
-    def __init__(self, access_token: str):
+    def __init__(self, access_token: str, http_client: Optional[httpx.AsyncClient] = None, tokens: Optional[Dict[str, Any]] = None):
+        self.client = http_client or get_http_client()
+        self.tokens = tokens
+        self._set_access_token(access_token)
+    
+    def _set_access_token(self, access_token: str):
         self.access_token = access_token
         self.headers = {
             "Authorization": f"Bearer {access_token}",
             "Content-Type": "application/json"
         }
     
+    def _read_tokens(self) -> Dict[str, Any]:
+        # Stores shared across processes may have been refreshed by another worker
+        if hasattr(self.tokens, "reload"):
+            self.tokens.reload()
+        return {"access_token": self.tokens.get("access_token"), "refresh_token": self.tokens.get("refresh_token")}
+    
+    async def _refresh_access_token(self, rejected_token: str) -> bool:
+        """Swap in a fresh access token, reusing one another request already refreshed."""
+        if self.tokens is None:
+            return False
+        
+        async with _refresh_lock:
+            # Token stores may hit the database, so keep them off the event loop
+            tokens = await run_in_threadpool(self._read_tokens)
+            
+            if tokens["access_token"] and tokens["access_token"] != rejected_token:
+                self._set_access_token(tokens["access_token"])
+                return True
+            
+            if not tokens["refresh_token"]:
+                return False
+            
+            token_data = await WhoopAuth.refresh_token(tokens["refresh_token"])
+            if not token_data or not token_data.get("access_token"):
+                return False
+            
+            await run_in_threadpool(self.tokens.update, token_data)
+            self._set_access_token(token_data["access_token"])
+            print("Refreshed WHOOP access token")
+            return True
+    
+    async def request(self, path: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        GET an API path and return the decoded JSON body, raising
+        httpx.HTTPStatusError once retries are exhausted. Responses are
+        served from the disk cache while fresh: for whoop_cache_ttl_seconds
+        when the window includes recent days, for the cache retention once it
+        is closed.
+        Windows ending today are never closed, so the daily sync only reuses
+        their responses within the TTL.
+        """
+        params = params or {}
+        
+        if response_cache:
+            closed = window_is_closed(params, settings.whoop_sync_overlap_days)
+            cached = await run_in_threadpool(
+                response_cache.get, path, params,
+                settings.whoop_cache_retention_days * 86400 if closed else settings.whoop_cache_ttl_seconds
+            )
+            if cached is not None:
+                return cached
+        
+        refreshed = False
+        attempt = 0
+        
+        while True:
+            await rate_limiter.acquire()
+            sent_token = self.access_token
+            
+            try:
+                response = await self.client.get(
+                    f"{self.BASE_URL}{path}",
+                    headers=self.headers,
+                    params=params
+                )
+            except httpx.TransportError as e:
+                if attempt >= settings.whoop_max_retries:
+                    raise
+                delay = backoff_seconds(attempt)
+                print(f"WHOOP request to {path} failed ({str(e)}), retrying in {delay:.1f}s")
+            else:
+                if response.status_code == 401 and not refreshed:
+                    refreshed = True
+                    if await self._refresh_access_token(sent_token):
+                        continue
+                
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= settings.whoop_max_retries:
+                    response.raise_for_status()
+                    body = response.json()
+                    if response_cache:
+                        await run_in_threadpool(response_cache.set, path, params, body)
+                    return body
+                
+                delay = retry_after_seconds(response)
+                if delay is None:
+                    delay = backoff_seconds(attempt)
+                print(f"WHOOP request to {path} returned {response.status_code}, retrying in {delay:.1f}s")
+            
+            attempt += 1
+            await asyncio.sleep(delay)
+    
     async def get_user_profile(self) -> Optional[Dict[str, Any]]:
         """Get user profile information. Note: requires read:profile scope which we don't have."""
         print("User profile endpoint requires read:profile scope which is not configured")
         return {"message": "Profile data unavailable - requires read:profile scope"}
     
+    async def iter_collection(self, path: str, start_date: date, end_date: date) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield the records of a v2 collection endpoint for a date range,
+        following next_token page by page.
+        """
+        # v2 API expects datetime format with timezone
+        params = {
+            "start": f"{start_date.isoformat()}T00:00:00.000Z",
+            "end": f"{end_date.isoformat()}T23:59:59.999Z",
+            "limit": self.PAGE_SIZE
+        }
+        
+        while True:
+            page = await self.request(path, params)
+            
+            for record in page.get("records", []):
+                yield record
+            
+            next_token = page.get("next_token")
+            if not next_token:
+                return
+            params["nextToken"] = next_token
+    
+    def iter_recovery_records(self, start_date: date, end_date: date) -> AsyncIterator[Dict[str, Any]]:
+        """Yield recovery records for a date range. In v2 API, HRV is part of recovery data as hrv_rmssd_milli."""
+        # Use v2 recovery endpoint from OpenAPI spec
+        return self.iter_collection(self.RECOVERY_PATH, start_date, end_date)
+    
+    def iter_sleep_records(self, start_date: date, end_date: date) -> AsyncIterator[Dict[str, Any]]:
+        """Yield sleep records for a date range."""
+        # Use v2 sleep endpoint from OpenAPI spec
+        return self.iter_collection(self.SLEEP_PATH, start_date, end_date)
+    
     async def get_recovery_data(self, start_date: date, end_date: date) -> Optional[Dict[str, Any]]:
-        """Get recovery data for a date range."""
+        """Get all pages of recovery data for a date range."""
         try:
-            # v2 API expects datetime format with timezone
-            params = {
-                "start": f"{start_date.isoformat()}T00:00:00.000Z",
-                "end": f"{end_date.isoformat()}T23:59:59.999Z"
-            }
-            
-            async with httpx.AsyncClient() as client:
-                # Use v2 recovery endpoint from OpenAPI spec
-                response = await client.get(
-                    f"{self.BASE_URL}/v2/recovery",
-                    headers=self.headers,
-                    params=params
-                )
-                response.raise_for_status()
-                return response.json()
+            return {"records": [record async for record in self.iter_recovery_records(start_date, end_date)]}
         except Exception as e:
             print(f"Error fetching recovery data: {str(e)}")
             # Try to get more detailed error info
@@ -47,37 +260,18 @@ class WhoopClient:
             return None
     
     async def get_sleep_data(self, start_date: date, end_date: date) -> Optional[Dict[str, Any]]:
-        """Get sleep data for a date range."""
+        """Get all pages of sleep data for a date range."""
         try:
-            # v2 API expects datetime format with timezone
-            params = {
-                "start": f"{start_date.isoformat()}T00:00:00.000Z",
-                "end": f"{end_date.isoformat()}T23:59:59.999Z"
-            }
-            
-            async with httpx.AsyncClient() as client:
-                # Use v2 sleep endpoint from OpenAPI spec
-                response = await client.get(
-                    f"{self.BASE_URL}/v2/activity/sleep",
-                    headers=self.headers,
-                    params=params
-                )
-                response.raise_for_status()
-                return response.json()
+            return {"records": [record async for record in self.iter_sleep_records(start_date, end_date)]}
         except Exception as e:
             print(f"Error fetching sleep data: {str(e)}")
             return None
-    
-    async def get_hrv_data(self, start_date: date, end_date: date) -> Optional[Dict[str, Any]]:
-        """Get HRV data for a date range. In v2 API, HRV is part of recovery data."""
-        # HRV data is now included in the recovery endpoint as hrv_rmssd_milli
-        return await self.get_recovery_data(start_date, end_date)
 
 
 class WhoopAuth:
     """WHOOP OAuth authentication handler."""
     
-    AUTH_URL = "https://api.prod.whoop.com/oauth"
+    AUTH_URL = f"{settings.whoop_api_base_url}/oauth"
     
     @staticmethod
     def get_authorization_url() -> str:
@@ -111,13 +305,12 @@ class WhoopAuth:
                 "redirect_uri": settings.whoop_redirect_uri
             }
             
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{WhoopAuth.AUTH_URL}/oauth2/token",
-                    data=data
-                )
-                response.raise_for_status()
-                return response.json()
+            response = await get_http_client().post(
+                f"{WhoopAuth.AUTH_URL}/oauth2/token",
+                data=data
+            )
+            response.raise_for_status()
+            return response.json()
         except Exception as e:
             print(f"Error exchanging code for token: {str(e)}")
             return None
@@ -133,13 +326,12 @@ class WhoopAuth:
                 "refresh_token": refresh_token
             }
             
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{WhoopAuth.AUTH_URL}/oauth2/token",
-                    data=data
-                )
-                response.raise_for_status()
-                return response.json()
+            response = await get_http_client().post(
+                f"{WhoopAuth.AUTH_URL}/oauth2/token",
+                data=data
+            )
+            response.raise_for_status()
+            return response.json()
         except Exception as e:
             print(f"Error refreshing token: {str(e)}")
             return None
\ No newline at end of file
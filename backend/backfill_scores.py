@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Full-history score backfill
+
+Rebuilds every habit and daily score from the stored habit entries using the
+vectorized NumPy scorer. Run after changing habit configuration such as
+compound_rate, decay_rate or thresholds.
+
+Usage:
+    python backfill_scores.py [--start YYYY-MM-DD] [--end YYYY-MM-DD]
+"""
+
+import argparse
+import sys
+from datetime import date
+from pathlib import Path
+
+# Add the app directory to Python path
+app_dir = Path(__file__).parent
+sys.path.insert(0, str(app_dir))
+
+from sqlmodel import Session
+from app.database import engine, create_db_and_tables
+from app.core.backfill import backfill_scores
+from app.core.completions import ensure_completions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild habit and daily scores")
+    parser.add_argument("--start", type=date.fromisoformat, help="first date to rebuild (default: first entry)")
+    parser.add_argument("--end", type=date.fromisoformat, help="last date to rebuild (default: today)")
+    args = parser.parse_args()
+    
+    create_db_and_tables()
+    
+    with Session(engine) as session:
+        # Momentum carried into the range is read from the completion bitsets
+        ensure_completions(session)
+        dates = backfill_scores(session, args.start, args.end)
+    
+    if dates:
+        print(f"Rebuilt scores for {len(dates)} dates ({dates[0]} to {dates[-1]})")
+    else:
+        print("No habit entries found, nothing to rebuild")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        print(f"Backfill failed: {e}")
+        sys.exit(1)
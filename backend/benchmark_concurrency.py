@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Concurrency load benchmark
+
+Sends a mix of dashboard reads, entry submissions and recalculations to a
+running API, first one request at a time and then concurrently, while probing
+/health to show whether the event loop stays responsive under load.
+
+Usage:
+    uvicorn app.main:app --port 8000
+    python benchmark_concurrency.py [--url http://127.0.0.1:8000] [--requests 200] [--concurrency 20]
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+
+import httpx
+
+
+def build_workload(habit_ids, count):
+    """Build a repeatable list of (method, path, json) requests."""
+    rng = random.Random(42)
+    today = date.today()
+    workload = []
+    
+    for _ in range(count):
+        kind = rng.random()
+        if kind < 0.4:
+            workload.append(("GET", "/api/scores/trends?days=90", None))
+        elif kind < 0.6:
+            workload.append(("GET", "/api/scores/daily", None))
+        elif kind < 0.9:
+            entry_date = today - timedelta(days=rng.randrange(30))
+            entry = {"habit_id": rng.choice(habit_ids), "date": entry_date.isoformat(), "value": rng.randrange(60)}
+            workload.append(("POST", "/api/habits/entries?wait=false", entry))
+        else:
+            workload.append(("POST", "/api/scores/recalculate", None))
+    
+    return workload
+
+
+async def send(client, method, path, body):
+    started = time.perf_counter()
+    response = await client.request(method, path, json=body)
+    response.raise_for_status()
+    return time.perf_counter() - started
+
+
+async def probe_health(client, stop, latencies):
+    """Measure /health latency every 20ms until stop is set."""
+    while not stop.is_set():
+        latencies.append(await send(client, "GET", "/health", None))
+        await asyncio.sleep(0.02)
+
+
+async def run_phase(client, workload, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def limited(request):
+        async with semaphore:
+            return await send(client, *request)
+    
+    stop = asyncio.Event()
+    health_latencies = []
+    probe = asyncio.create_task(probe_health(client, stop, health_latencies))
+    
+    started = time.perf_counter()
+    latencies = await asyncio.gather(*(limited(request) for request in workload))
+    elapsed = time.perf_counter() - started
+    
+    stop.set()
+    await probe
+    
+    return elapsed, latencies, health_latencies
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def report(label, elapsed, latencies, health_latencies):
+    print(f"{label}:")
+    print(f"  {len(latencies)} requests in {elapsed:.2f}s ({len(latencies) / elapsed:.1f} req/s)")
+    print(f"  request latency p50 {statistics.median(latencies) * 1000:.1f}ms, p95 {percentile(latencies, 0.95) * 1000:.1f}ms")
+    if health_latencies:
+        print(f"  /health latency p50 {statistics.median(health_latencies) * 1000:.1f}ms, "
+              f"p95 {percentile(health_latencies, 0.95) * 1000:.1f}ms, max {max(health_latencies) * 1000:.1f}ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark concurrent API load")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="base URL of a running API")
+    parser.add_argument("--requests", type=int, default=200, help="requests per phase")
+    parser.add_argument("--concurrency", type=int, default=20, help="requests in flight in the concurrent phase")
+    args = parser.parse_args()
+    
+    limits = httpx.Limits(max_connections=args.concurrency + 1)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=120.0) as client:
+        habits = (await client.get("/api/habits/")).json()
+        if not habits:
+            print("No habits configured, nothing to benchmark")
+            return
+        
+        workload = build_workload([habit["id"] for habit in habits], args.requests)
+        
+        sequential = await run_phase(client, workload, 1)
+        report("Sequential", *sequential)
+        
+        concurrent = await run_phase(client, workload, args.concurrency)
+        report(f"Concurrent ({args.concurrency} in flight)", *concurrent)
+        
+        print(f"Speedup: {sequential[0] / concurrent[0]:.2f}x")
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except Exception as e:
+        print(f"Benchmark failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Score aggregate rebuild
+
+Recomputes the daily and per-habit streak runs and the weekly score totals
+from the stored scores. They are normally maintained incrementally as scores
+are written; run this if they are ever suspected to be out of sync.
+
+Usage:
+    python rebuild_aggregates.py
+"""
+
+import sys
+from pathlib import Path
+
+# Add the app directory to Python path
+app_dir = Path(__file__).parent
+sys.path.insert(0, str(app_dir))
+
+from sqlmodel import Session
+from app.database import engine, create_db_and_tables
+from app.core.aggregates import rebuild_aggregates
+
+if __name__ == "__main__":
+    print("Rebuilding score aggregates...")
+    try:
+        create_db_and_tables()
+        with Session(engine) as session:
+            rebuild_aggregates(session)
+        print("Score aggregates rebuilt successfully")
+    except Exception as e:
+        print(f"Failed to rebuild score aggregates: {e}")
+        sys.exit(1)
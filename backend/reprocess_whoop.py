@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Offline WHOOP reprocessing
+
+Rebuilds the stored WHOOP data from the cached raw API responses, without
+calling the WHOOP API, then recomputes scores from the earliest changed date.
+Run after changing how WHOOP records are parsed or how the multiplier is
+calculated. Needs WHOOP_CACHE_DIR set, and only covers responses fetched
+within WHOOP_CACHE_RETENTION_DAYS.
+
+Usage:
+    python reprocess_whoop.py
+"""
+
+import sys
+from pathlib import Path
+
+# Add the app directory to Python path
+app_dir = Path(__file__).parent
+sys.path.insert(0, str(app_dir))
+
+from sqlmodel import Session
+from app.database import engine, create_db_and_tables
+from app.core.completions import ensure_completions
+from app.core.scoring import propagate_score_changes
+from app.core.whoop_sync import reprocess_cached_whoop
+from app.utils.whoop_client import response_cache
+
+
+def main():
+    if response_cache is None:
+        print("WHOOP response cache is disabled (whoop_cache_dir is empty), nothing to reprocess")
+        return
+    
+    create_db_and_tables()
+    
+    with Session(engine) as session:
+        dates = reprocess_cached_whoop(session, response_cache)
+        
+        if dates:
+            ensure_completions(session)
+            propagate_score_changes(session, min(dates), changed_through=max(dates))
+    
+    if dates:
+        print(f"Reprocessed WHOOP data for {len(dates)} dates ({min(dates)} to {max(dates)})")
+    else:
+        print("Cached WHOOP responses match the stored data, nothing to update")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        print(f"Reprocessing failed: {e}")
+        sys.exit(1)
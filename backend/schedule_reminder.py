@@ -6,12 +6,12 @@ This script runs daily maintenance tasks including:
 - WHOOP data synchronization from API to database
 - Morning habit reminder email notifications
 
+The running app schedules these itself (see WHOOP_SYNC_TIME and
+DAILY_REMINDER_TIME), so this script is only needed to run them once by
+hand or when the app's scheduler is disabled.
+
 Usage:
     python schedule_reminder.py
-
-Recommended scheduling:
-    - Unix/Linux cron: 45 15 * * * /path/to/python /path/to/schedule_reminder.py
-    - Windows Task Scheduler: Run daily at 8:45 AM MST (15:45 UTC)
 """
 
 import sys
@@ -0,0 +1,41 @@
+import math
+import pytest
+from app.models import Habit
+from app.core.scoring import apply_transition, momentum_transition
+from app.core.momentum_tree import TransitionTree
+
+
+def direct_momentum(transitions):
+    """Momentum after each day, applying the daily rules one by one from 1.0."""
+    momentum = 1.0
+    history = []
+    for transition in transitions:
+        momentum = apply_transition(transition, momentum)
+        history.append(momentum)
+    return history
+
+
+@pytest.mark.parametrize("habit, days", [
+    # A long idle run decays the composed scale past the smallest float
+    (Habit(name="Read", decay_rate=0.5), [0.0] * 600 + [1.0] * 30),
+    (Habit(name="Run", compound_rate=1.15, decay_rate=0.9), [1.0] * 100 + [0.0] * 3000 + [1.0] * 10),
+])
+def test_prefix_matches_daily_rules_after_long_idle_run(habit, days):
+    transitions = [momentum_transition(habit, completion_rate) for completion_rate in days]
+    tree = TransitionTree(transitions)
+    
+    for count, expected in enumerate(direct_momentum(transitions), start=1):
+        momentum = apply_transition(tree.prefix(count), 1.0)
+        assert not math.isnan(momentum)
+        assert momentum == pytest.approx(expected, rel=1e-9)
+
+
+def test_update_recomposes_after_long_idle_run():
+    habit = Habit(name="Read", decay_rate=0.5)
+    transitions = [momentum_transition(habit, 0.0)] * 2000 + [momentum_transition(habit, 1.0)] * 20
+    tree = TransitionTree(transitions)
+    
+    transitions[1000] = momentum_transition(habit, 1.0)
+    tree.update(1000, transitions[1000])
+    
+    assert apply_transition(tree.prefix(len(transitions)), 1.0) == pytest.approx(direct_momentum(transitions)[-1])